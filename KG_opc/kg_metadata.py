@@ -9,6 +9,25 @@ from pathlib import Path
 from KG_opc.kg_persistor import KGPersistor
 import d_config.demo_settings as settings
 
+# Tag node property -> plant_config.csv column
+TAG_ENRICHMENT_COLUMNS = {
+    "unit": "Unit",
+    "description": "Description",
+    "min_value": "Min Value",
+    "max_value": "Max Value",
+    "engineering_units": "Engineering Units",
+    "scan": "Scan",
+    "display_limits": "Display Limits",
+    "alarm_limit": "Alarm Limits",
+    "category": "Category"
+}
+
+# Make sure the Event/Concept labels exist before any events are written
+SCHEMA_INIT_QUERIES = (
+    "MERGE (e:Event {__schema_init__: true}) REMOVE e.__schema_init__",
+    "MERGE (c:Concept {__schema_init__: true}) REMOVE c.__schema_init__"
+)
+
 def build_static_kg(kg):
     logger = settings.setup_logging()
     logger.info("[KG Metadata Builder] Starting metadata-driven KG insertion")
@@ -28,90 +47,60 @@ def build_static_kg(kg):
     logger.info(f"[KG Init] Loaded {len(alarm_df)} rows from alarm.csv")
 
     # --- Asset & Tag Structure ---
+    # Rows are collected per label and written as UNWIND batches; entities go
+    # first (in row order, so later SETs still win) and relationships after
     logger.info("[KG Metadata Builder] Inserting Assets and Tags")
-    for _, row in asset_df.iterrows():
-        asset_id = row["Element"]
-        tag_name = row["Attribute"]
-        system = row["System"]
-        category = row["Category"]
-
-        kg.insert_entity({"label": "Asset", "properties": {"id": asset_id, "system": system}})
-        kg.insert_entity({"label": "Tag", "properties": {"name": tag_name, "category": category}})
-
-        kg.insert_relationship({
-            "from": {"label": "Asset", "key": "id", "value": asset_id},
-            "to": {"label": "Tag", "key": "name", "value": tag_name},
-            "type": "MEASURES"
-        })
-
-        kg.insert_relationship({
-            "from": {"label": "Tag", "key": "name", "value": tag_name},
-            "to": {"label": "System", "key": "name", "value": system},
-            "type": "PART_OF"
-        })
-
-        kg.insert_entity({"label": "System", "properties": {"name": system}})
-        kg.insert_entity({"label": "Category", "properties": {"name": category}})
-
-        kg.insert_relationship({
-            "from": {"label": "Tag", "key": "name", "value": tag_name},
-            "to": {"label": "Category", "key": "name", "value": category},
-            "type": "IS_TYPE"
-        })
+    assets = asset_df[["Element", "Attribute", "System", "Category"]].to_dict("records")
+    kg.insert_entities_bulk("Asset", [{"id": r["Element"], "system": r["System"]} for r in assets])
+    kg.insert_entities_bulk("Tag", [{"name": r["Attribute"], "category": r["Category"]} for r in assets])
+    kg.insert_entities_bulk("System", [{"name": r["System"]} for r in assets])
+    kg.insert_entities_bulk("Category", [{"name": r["Category"]} for r in assets])
+
+    relationships = []
+    for r in assets:
+        tag_ref = {"label": "Tag", "key": "name", "value": r["Attribute"]}
+        relationships += [
+            {"from": {"label": "Asset", "key": "id", "value": r["Element"]}, "to": tag_ref, "type": "MEASURES"},
+            {"from": tag_ref, "to": {"label": "System", "key": "name", "value": r["System"]}, "type": "PART_OF"},
+            {"from": tag_ref, "to": {"label": "Category", "key": "name", "value": r["Category"]}, "type": "IS_TYPE"},
+        ]
+    kg.insert_relationships_bulk(relationships)
 
     # --- Enrich Tags from Plant Config ---
     logger.info("[KG Metadata Builder] Enriching Tags from plant_config.csv")
-    for _, row in plant_config_df.iterrows():
-        tag = row["Tag Name"]
-        enriched_props = {
-            "unit": row.get("Unit"),
-            "description": row.get("Description"),
-            "min_value": row.get("Min Value"),
-            "max_value": row.get("Max Value"),
-            "engineering_units": row.get("Engineering Units"),
-            "scan": row.get("Scan"),
-            "display_limits": row.get("Display Limits"),
-            "alarm_limit": row.get("Alarm Limits"),
-            "category": row.get("Category")
-        }
-
-        kg.insert_entity({
-            "label": "Tag",
-            "properties": {
-                "name": tag,
-                **{k: v for k, v in enriched_props.items() if pd.notna(v)}
-            }
-        })
+    # Nulls become None, which the persistor drops from each row before SET +=
+    enrich_columns = {"Tag Name": "name", **{col: prop for prop, col in TAG_ENRICHMENT_COLUMNS.items()}}
+    enrich_df = plant_config_df.reindex(columns=list(enrich_columns)).rename(columns=enrich_columns)
+    enriched_tags = enrich_df.astype(object).where(enrich_df.notna(), None).to_dict("records")
+    kg.insert_entities_bulk("Tag", enriched_tags)
 
     # --- Alarms and Thresholds ---
     logger.info("[KG Metadata Builder] Inserting Alarms and Thresholds")
-    for _, row in alarm_df.iterrows():
+    alarms = []
+    triggers = []
+    for row in alarm_df.to_dict("records"):
         tag = row["Tag Name"]
         alarm_type = row["Alarm Type"]
-        threshold = row["Threshold"]
-        priority = row["Priority"]
-        hysteresis = row["Hysteresis"]
-        description = row["Description"]
-
         alarm_id = f"{tag}_{alarm_type}"
 
-        kg.insert_entity({"label": "Alarm", "properties": {
+        alarms.append({
             "id": alarm_id,
             "type": alarm_type,
-            "priority": priority,
-            "threshold": threshold,
-            "hysteresis": hysteresis,
-            "description": description
-        }})
-
-        kg.insert_relationship({
+            "priority": row["Priority"],
+            "threshold": row["Threshold"],
+            "hysteresis": row["Hysteresis"],
+            "description": row["Description"]
+        })
+        triggers.append({
             "from": {"label": "Tag", "key": "name", "value": tag},
             "to": {"label": "Alarm", "key": "id", "value": alarm_id},
             "type": "TRIGGERS_ON"
         })
+    kg.insert_entities_bulk("Alarm", alarms)
+    kg.insert_relationships_bulk(triggers)
 
     # Schema Init
     with kg.get_session() as session:
-        session.run("MERGE (e:Event {__schema_init__: true}) REMOVE e.__schema_init__")
-        session.run("MERGE (c:Concept {__schema_init__: true}) REMOVE c.__schema_init__")
+        for query in SCHEMA_INIT_QUERIES:
+            session.run(query)
     logger.info("[KG Metadata Builder] Ensured Event/Concept labels exist")
@@ -3,16 +3,142 @@ kg_persistor.py
 Handles persistence of entities and relationships to Neo4j KG
 """
 
-from neo4j import GraphDatabase, basic_auth
-from typing import Dict, Any, Optional
+from neo4j import AsyncGraphDatabase, GraphDatabase, basic_auth
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from contextlib import contextmanager
+from functools import lru_cache, partial
+
+try:
+    import httpx  # Optional: HTTP transactional endpoint for bulk loads
+except ImportError:
+    httpx = None
+
+try:
+    import orjson  # Optional: faster request bodies for the HTTP endpoint
+except ImportError:
+    orjson = None
+
+try:
+    import h2  # noqa: F401  (lets httpx negotiate HTTP/2)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
 
 logger = logging.getLogger("kg.persistor")
 
+
+# Property that identifies a node of each label in MERGE queries.
+# Labels not listed here are merged on their full property set.
+_MERGE_KEYS = {
+    "Concept": "text",
+    "Tag": "name",
+    "Asset": "id",
+    "Alarm": "id",
+    "System": "name",
+    "Category": "name"
+}
+
+# Properties that must be present (non-empty) for each label
+_REQUIRED_FIELDS = {
+    "Event": frozenset({"timestamp", "event_type"}),
+    "Concept": frozenset({"text"}),
+    "Tag": frozenset({"name"}),
+    "Asset": frozenset({"id"}),
+    "Alarm": frozenset({"id"}),
+    "System": frozenset({"name"})
+}
+
+# Non-unique lookup indexes for labels that are not merged on a single key
+_LOOKUP_INDEXES = {
+    "Event": "timestamp"
+}
+
+BULK_BATCH_SIZE = 10_000
+SESSION_FETCH_SIZE = 1000
+MAX_CONNECTION_POOL_SIZE = 100
+CONNECTION_ACQUISITION_TIMEOUT = 60  # seconds
+
+
+# --- Cypher builders ---
+# Labels and relationship types cannot be query parameters, so each query
+# shape is rendered once and reused. Identical query text lets Neo4j serve
+# repeat inserts from its plan cache instead of re-planning every call.
+@lru_cache(maxsize=512)
+def _entity_query(label: str, key: Optional[str], prop_keys: Tuple[str, ...] = ()) -> str:
+    """MERGE query for one entity, keyed on `key` or on all of `prop_keys`"""
+    if key:
+        return f"MERGE (n:{label} {{{key}: $key}}) SET n += $props"
+    match = ', '.join(f'{k}: $props.{k}' for k in prop_keys)
+    return f"MERGE (n:{label} {{ {match} }})"
+
+
+@lru_cache(maxsize=512)
+def _bulk_entity_query(label: str, key: Optional[str], prop_keys: Tuple[str, ...] = ()) -> str:
+    """UNWIND variant of _entity_query() for a list of property maps"""
+    if key:
+        return f"UNWIND $rows AS r MERGE (n:{label} {{{key}: r.{key}}}) SET n += r"
+    match = ', '.join(f'{k}: r.{k}' for k in prop_keys)
+    return f"UNWIND $rows AS r MERGE (n:{label} {{ {match} }})"
+
+
+@lru_cache(maxsize=256)
+def _relationship_query(from_label: str, from_key: str, to_label: str,
+                        to_key: str, rel_type: str, prop_keys: Tuple[str, ...] = (),
+                        bulk: bool = False) -> str:
+    """
+    MERGE query for a relationship and its endpoints (UNWIND form if bulk).
+    The relationship is matched on all of `prop_keys`, so edges of one type
+    with different properties stay distinct.
+    """
+    src = "r.from_value" if bulk else "$from_value"
+    dst = "r.to_value" if bulk else "$to_value"
+    props = "r.props" if bulk else "$props"
+    match = ', '.join(f'{k}: {props}.{k}' for k in prop_keys)
+    return (
+        f"{'UNWIND $rows AS r ' if bulk else ''}"
+        f"MERGE (a:{from_label} {{{from_key}: {src}}}) "
+        f"MERGE (b:{to_label} {{{to_key}: {dst}}}) "
+        f"MERGE (a)-[x:{rel_type}{f' {{ {match} }}' if match else ''}]->(b)"
+    )
+
+
+def _http_body(payload: Dict[str, Any]) -> bytes:
+    """JSON request body; values JSON cannot represent are sent as str()"""
+    if orjson is not None:
+        # Datetimes go through default=str too, matching the json fallback's format
+        return orjson.dumps(payload, default=str, option=(
+            orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ))
+    return json.dumps(payload, default=str).encode()
+
+
+_REL_TYPES_QUERY = "CALL db.relationshipTypes()"
+
+# (query, merge key) for every keyed label, rendered once at import
+_ENTITY_QUERIES = {
+    label: (_entity_query(label, key), key)
+    for label, key in _MERGE_KEYS.items()
+}
+
+
 class KGPersistor:
-    def __init__(self, uri: str, user: str, password: str, database: str):
+    # One driver (and so one Bolt connection pool) per (uri, user, password
+    # digest) for the whole process, with the number of open persistors using
+    # each; a rotated password gets a new driver instead of the stale one
+    _DRIVERS: Dict[Tuple[str, str, str], Any] = {}
+    _DRIVER_REFS: Dict[Tuple[str, str, str], int] = {}
+    _DRIVERS_LOCK = threading.Lock()
+
+    def __init__(self, uri: str, user: str, password: str, database: str = "neo4j",
+                 http_url: Optional[str] = None,
+                 max_connection_pool_size: int = MAX_CONNECTION_POOL_SIZE):
         """
         Initialize KG persistor with secure connection
 
@@ -21,28 +147,98 @@ class KGPersistor:
             user: Database username
             password: Database password  
             database: Optional database name
+            http_url: Optional HTTP endpoint (e.g., "http://localhost:7474");
+                when set, bulk inserts are committed over HTTP
+            max_connection_pool_size: Pool size if this creates the shared driver
         """
+        self.driver = None
         try:
-            self.driver = GraphDatabase.driver(
-                uri,
-                auth=basic_auth(user, password),
-                encrypted=False
-            )
+            self._driver_key = self._make_driver_key(uri, user, password)
+            self.driver = self._acquire_driver(self._driver_key, password, max_connection_pool_size)
             self.database = database
+            # Session factory with the database bound once
+            self._new_session = partial(self.driver.session, database=database)
+            self._uri = uri
+            self._auth = basic_auth(user, password)
+            self._async_driver = None  # Created on first async insert
+            self._http_url = http_url.rstrip("/") if http_url else None
+            self._http_auth = (user, password)
             self._tx = None  # Track current transaction if any
+            self._session = None  # Session owning self._tx
+            self._batch_size = None  # Group-commit size when batching
+            self._pending = 0  # Writes since the last group commit
 
             # Verify connection
             with self.get_session() as session:
                 session.run("RETURN 1")
+                self._ensure_schema(session)
 
             logger.info(f"Connected to Neo4j at {uri} (DB: {database or 'default'})")
         except Exception as e:
             logger.error(f"Neo4j connection failed: {str(e)}")
+            if self.driver is not None:
+                self._release_driver()
             raise
 
+    @staticmethod
+    def _make_driver_key(uri: str, user: str, password: str) -> Tuple[str, str, str]:
+        """Shared-driver key; the password is kept only as a digest"""
+        return uri, user, hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _acquire_driver(cls, key: Tuple[str, str, str], password: str, pool_size: int):
+        """Return the shared driver for key, creating it on first use"""
+        uri, user, _ = key
+        with cls._DRIVERS_LOCK:
+            driver = cls._DRIVERS.get(key)
+            if driver is None:
+                driver = GraphDatabase.driver(
+                    uri,
+                    auth=basic_auth(user, password),
+                    encrypted=False,
+                    max_connection_pool_size=pool_size,
+                    connection_acquisition_timeout=CONNECTION_ACQUISITION_TIMEOUT,
+                    fetch_size=SESSION_FETCH_SIZE
+                )
+                cls._DRIVERS[key] = driver
+                cls._DRIVER_REFS[key] = 0
+            cls._DRIVER_REFS[key] += 1
+            return driver
+
+    def _release_driver(self):
+        """Drop this instance's hold on the shared driver; the last one closes it"""
+        key = self._driver_key
+        with KGPersistor._DRIVERS_LOCK:
+            KGPersistor._DRIVER_REFS[key] -= 1
+            if KGPersistor._DRIVER_REFS[key] == 0:
+                del KGPersistor._DRIVER_REFS[key]
+                KGPersistor._DRIVERS.pop(key).close()
+        self.driver = None
+
+    @staticmethod
+    def _ensure_schema(session) -> None:
+        """
+        Create a uniqueness constraint for every MERGE key (so MERGE is an
+        index lookup rather than a label scan) plus the lookup indexes.
+        Failures, e.g. from existing duplicate data, are logged, not raised.
+        """
+        statements = [
+            f"CREATE CONSTRAINT {label.lower()}_{key}_unique IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.{key} IS UNIQUE"
+            for label, key in _MERGE_KEYS.items()
+        ] + [
+            f"CREATE INDEX {label.lower()}_{key}_idx IF NOT EXISTS FOR (n:{label}) ON (n.{key})"
+            for label, key in _LOOKUP_INDEXES.items()
+        ]
+        for statement in statements:
+            try:
+                session.run(statement).consume()
+            except Exception as e:
+                logger.warning(f"Schema statement failed ({statement}): {str(e)}")
+
     def get_session(self, **kwargs):
         """Get a Neo4j session with configured database"""
-        return self.driver.session(database=self.database, **kwargs)
+        return self._new_session(**kwargs)
 
     @contextmanager
     def start_transaction(self):
@@ -50,19 +246,59 @@ class KGPersistor:
         Start a transaction context.
         Commits if successful, rolls back on exception.
         """
-        session = self.driver.session(database=self.database)
-        tx = session.begin_transaction()
-        self._tx = tx
+        self._session = self.get_session()
+        self._tx = self._session.begin_transaction()
         try:
             yield
-            tx.commit()
+            self._tx.commit()
         except Exception as e:
-            tx.rollback()
+            self._tx.rollback()
             raise
         finally:
-            session.close()
+            self._session.close()
+            self._session = None
             self._tx = None
 
+    @contextmanager
+    def batched_transaction(self, batch_size: int = 1000):
+        """
+        Start a group-commit transaction context.
+
+        All inserts made inside the block share one session. The open
+        transaction is committed and replaced every `batch_size` writes,
+        and committed once more on exit. On exception only the writes
+        since the last group commit are rolled back.
+
+        Yields:
+            Writer callable: writer(tx_function, *args)
+        """
+        with self.start_transaction():
+            self._batch_size = batch_size
+            self._pending = 0
+            try:
+                yield self._write
+            finally:
+                self._batch_size = None
+                self._pending = 0
+
+    def _write(self, work, *args):
+        """
+        Run a transaction function in the active transaction, or in a
+        managed write transaction of its own when none is open.
+        """
+        if not self._tx:
+            with self.get_session() as session:
+                return session.execute_write(work, *args)
+
+        result = work(self._tx, *args)
+        if self._batch_size:
+            self._pending += 1
+            if self._pending >= self._batch_size:
+                self._tx.commit()
+                self._tx = self._session.begin_transaction()
+                self._pending = 0
+        return result
+
     def insert_entity(self, entity: Dict[str, Any]):
         """
         Insert an entity into the KG after validating and sanitizing input.
@@ -83,18 +319,28 @@ class KGPersistor:
             return
 
         try:
-            if self._tx:
-                self._create_entity(self._tx, label, cleaned_props)
-            else:
-                with self.get_session() as session:
-                    session.execute_write(
-                        self._create_entity, label, cleaned_props
-                    )
+            self._write(self._create_entity, label, cleaned_props)
             logger.debug(f"[KG Insert] Inserted {label}: {cleaned_props}")
         except Exception as e:
             logger.error(f"Failed to insert entity: {str(e)}")
             raise
 
+    def validate_entity(self, entity: Dict[str, Any]) -> bool:
+        """
+        Check an entity against its label's required fields without writing it.
+
+        Args:
+            entity: Dict in the same shape as insert_entity()
+
+        Returns:
+            True if insert_entity() would write it
+        """
+        label = str(entity.get("label"))
+        valid, _, errors = self._validate_entity(label, entity.get("properties", {}))
+        if not valid:
+            logger.warning(f"[KG Insert] Skipping {label}: {errors}")
+        return valid
+
     def insert_relationship(self, relationship: Dict[str, Any]):
         """
         Insert a relationship into the KG
@@ -108,60 +354,327 @@ class KGPersistor:
             }
         """
         try:
-            if self._tx:
-                self._create_relationship(
-                    self._tx,
-                    relationship["from"]["label"],
-                    relationship["from"]["key"],
-                    relationship["from"]["value"],
-                    relationship["to"]["label"],
-                    relationship["to"]["key"],
-                    relationship["to"]["value"],
-                    relationship["type"],
-                    relationship.get("properties", {})
+            self._write(
+                self._create_relationship,
+                relationship["from"]["label"],
+                relationship["from"]["key"],
+                relationship["from"]["value"],
+                relationship["to"]["label"],
+                relationship["to"]["key"],
+                relationship["to"]["value"],
+                relationship["type"],
+                relationship.get("properties", {})
+            )
+            logger.debug(f"Created relationship: {relationship['type']}")
+        except Exception as e:
+            logger.error(f"Failed to create relationship: {str(e)}")
+            raise
+
+    # --- Async API ---
+    # Coroutines for callers running their own event loop, e.g. many inserts
+    # awaited together with asyncio.gather() to overlap Bolt round trips.
+    def _get_async_driver(self):
+        """Lazily create the async driver (same URI and credentials)"""
+        if self._async_driver is None:
+            self._async_driver = AsyncGraphDatabase.driver(self._uri, auth=self._auth, encrypted=False)
+        return self._async_driver
+
+    async def ainsert_entity(self, entity: Dict[str, Any]):
+        """Async insert_entity(), each call in its own session and transaction"""
+        label = str(entity.get("label"))
+        props = entity.get("properties", {})
+
+        valid, cleaned_props, errors = self._validate_entity(label, props)
+        if not valid:
+            logger.warning(f"[KG Insert] Skipping {label}: {errors}")
+            return
+
+        try:
+            async with self._get_async_driver().session(database=self.database) as session:
+                await session.execute_write(self._acreate_entity, label, cleaned_props)
+            logger.debug(f"[KG Insert] Inserted {label}: {cleaned_props}")
+        except Exception as e:
+            logger.error(f"Failed to insert entity: {str(e)}")
+            raise
+
+    async def ainsert_relationship(self, relationship: Dict[str, Any]):
+        """Async insert_relationship(), each call in its own session and transaction"""
+        try:
+            src, dst = relationship["from"], relationship["to"]
+            props = relationship.get("properties") or {}
+            query = _relationship_query(
+                src["label"], src["key"], dst["label"], dst["key"], relationship["type"], tuple(sorted(props))
+            )
+            async with self._get_async_driver().session(database=self.database) as session:
+                await session.execute_write(
+                    self._arun, query,
+                    from_value=src["value"],
+                    to_value=dst["value"],
+                    props=props
                 )
-            else:
-                with self.get_session() as session:
-                    session.execute_write(
-                        self._create_relationship,
-                        relationship["from"]["label"],
-                        relationship["from"]["key"],
-                        relationship["from"]["value"],
-                        relationship["to"]["label"],
-                        relationship["to"]["key"],
-                        relationship["to"]["value"],
-                        relationship["type"],
-                        relationship.get("properties", {})
-                    )
             logger.debug(f"Created relationship: {relationship['type']}")
         except Exception as e:
             logger.error(f"Failed to create relationship: {str(e)}")
             raise
 
+    async def aclose(self):
+        """Close the async driver, if one was created"""
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+
+    @staticmethod
+    async def _acreate_entity(tx, label: str, properties: Dict[str, Any]):
+        """Async transaction method for entity creation"""
+        query, key = _ENTITY_QUERIES.get(label, (None, None))
+        if key in properties:
+            await tx.run(query, key=properties[key], props=properties)
+        else:
+            await tx.run(_entity_query(label, None, tuple(sorted(properties))), props=properties)
+
+    @staticmethod
+    async def _arun(tx, query: str, **params):
+        """Async transaction method for a single parameterized query"""
+        await tx.run(query, **params)
+
+    def insert_entities_bulk(self, label: str, rows: List[Dict[str, Any]],
+                             batch_size: int = BULK_BATCH_SIZE) -> int:
+        """
+        Insert many entities of one label using UNWIND batches.
+
+        Args:
+            label: Entity type shared by all rows
+            rows: Property dicts, one per entity
+            batch_size: Maximum number of rows sent per query
+
+        Returns:
+            Number of entities written
+        """
+        groups = self._group_entities((label, props) for props in rows)
+        written = self._write_bulk(groups, batch_size)
+        logger.debug(f"[KG Bulk] Inserted {written} {label} entities")
+        return written
+
+    def insert_relationships_bulk(self, relationships: List[Dict[str, Any]],
+                                  batch_size: int = BULK_BATCH_SIZE) -> int:
+        """
+        Insert many relationships using UNWIND batches.
+
+        Relationships are grouped by (from_label, from_key, to_label, to_key, type)
+        so each group shares a single query.
+
+        Args:
+            relationships: Dicts in the same shape as insert_relationship()
+            batch_size: Maximum number of rows sent per query
+
+        Returns:
+            Number of relationships written
+        """
+        groups = self._group_relationships(relationships)
+        written = self._write_bulk(groups, batch_size)
+        logger.debug(f"[KG Bulk] Created {written} relationships")
+        return written
+
+    def insert_many(self, entities: List[Dict[str, Any]],
+                    relationships: Optional[List[Dict[str, Any]]] = None,
+                    workers: int = 8,
+                    batch_size: int = BULK_BATCH_SIZE) -> Tuple[int, int]:
+        """
+        Insert entities, then relationships, through a pool of concurrent writers.
+
+        Rows are sharded so a node is only ever written by one worker:
+        entities by (label, merge key), relationships by their source node.
+        This keeps concurrent transactions from waiting on each other's node
+        locks. Each worker owns a session and sends UNWIND batches.
+        Must not be called inside start_transaction()/batched_transaction().
+
+        Args:
+            entities: Dicts in the same shape as insert_entity()
+            relationships: Dicts in the same shape as insert_relationship()
+            workers: Number of concurrent sessions
+            batch_size: Maximum number of rows sent per query
+
+        Returns:
+            Tuple: (entities_written, relationships_written)
+        """
+        entity_shards = [[] for _ in range(workers)]
+        for entity in entities:
+            label = str(entity.get("label"))
+            props = entity.get("properties", {})
+            key = _MERGE_KEYS.get(label)
+            identity = props.get(key) if key in props else sorted(props.items())
+            entity_shards[hash((label, repr(identity))) % workers].append((label, props))
+
+        rel_shards = [[] for _ in range(workers)]
+        for rel in relationships or []:
+            src = rel["from"]
+            rel_shards[hash((src["label"], repr(src["value"]))) % workers].append(rel)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kg-writer") as pool:
+            entity_groups = [self._group_entities(shard) for shard in entity_shards if shard]
+            entities_written = sum(pool.map(
+                partial(self._write_shard, batch_size=batch_size), entity_groups
+            ))
+            # Relationships run after all entities so their endpoints already exist
+            rel_groups = [self._group_relationships(shard) for shard in rel_shards if shard]
+            rels_written = sum(pool.map(
+                partial(self._write_shard, batch_size=batch_size), rel_groups
+            ))
+
+        logger.info(
+            f"[KG Bulk] Wrote {entities_written} entities and "
+            f"{rels_written} relationships with {workers} workers"
+        )
+        return entities_written, rels_written
+
+    def _group_entities(self, entities: Iterable[Tuple[str, Dict[str, Any]]]
+                        ) -> Dict[str, List[Dict[str, Any]]]:
+        """Validate (label, properties) pairs and group them by UNWIND query"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for label, props in entities:
+            valid, cleaned_props, errors = self._validate_entity(label, props)
+            if not valid:
+                logger.warning(f"[KG Bulk] Skipping {label}: {errors}")
+                continue
+            key = _MERGE_KEYS.get(label)
+            if key in cleaned_props:
+                query = _bulk_entity_query(label, key)
+            else:
+                query = _bulk_entity_query(label, None, tuple(sorted(cleaned_props)))
+            groups.setdefault(query, []).append(cleaned_props)
+        return groups
+
+    @staticmethod
+    def _group_relationships(relationships: Iterable[Dict[str, Any]]
+                             ) -> Dict[str, List[Dict[str, Any]]]:
+        """Group relationship dicts by UNWIND query"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for rel in relationships:
+            src, dst = rel["from"], rel["to"]
+            props = rel.get("properties") or {}
+            query = _relationship_query(
+                src["label"], src["key"], dst["label"], dst["key"], rel["type"], tuple(sorted(props)), bulk=True
+            )
+            groups.setdefault(query, []).append({
+                "from_value": src["value"],
+                "to_value": dst["value"],
+                "props": props
+            })
+        return groups
+
+    @staticmethod
+    def _iter_batches(groups: Dict[str, List[Dict[str, Any]]], batch_size: int):
+        """Yield (query, rows) slices of at most batch_size rows"""
+        for query, rows in groups.items():
+            for start in range(0, len(rows), batch_size):
+                yield query, rows[start:start + batch_size]
+
+    def _write_bulk(self, groups: Dict[str, List[Dict[str, Any]]], batch_size: int) -> int:
+        """Run grouped UNWIND queries through the active (or a managed) transaction"""
+        if self._http_url and self._tx is None:
+            statements = [
+                {"statement": query, "parameters": {"rows": batch}}
+                for query, batch in self._iter_batches(groups, batch_size)
+            ]
+            self.bulk_commit_http(statements)
+            return sum(len(s["parameters"]["rows"]) for s in statements)
+
+        written = 0
+        try:
+            for query, batch in self._iter_batches(groups, batch_size):
+                self._write(self._run_bulk, query, batch)
+                written += len(batch)
+        except Exception as e:
+            logger.error(f"Bulk write failed after {written} rows: {str(e)}")
+            raise
+        return written
+
+    def bulk_commit_http(self, statements: List[Dict[str, Any]],
+                         statements_per_request: int = 100) -> int:
+        """
+        Commit statements through Neo4j's HTTP transactional endpoint.
+
+        Statements are split into requests of at most statements_per_request;
+        each request is one POST to /db/{database}/tx/commit (a single
+        transaction) and the requests are sent concurrently. Meant for
+        one-off bulk loads, the live insert path stays on Bolt.
+
+        Args:
+            statements: [{"statement": cypher, "parameters": {...}}, ...]
+            statements_per_request: Maximum statements per transaction
+
+        Returns:
+            Number of statements committed
+        """
+        if not self._http_url:
+            raise RuntimeError("HTTP bulk commit requires http_url")
+        if httpx is None:
+            raise RuntimeError("HTTP bulk commit requires the 'httpx' package")
+
+        requests = [
+            statements[start:start + statements_per_request]
+            for start in range(0, len(statements), statements_per_request)
+        ]
+        asyncio.run(self._post_http_transactions(requests))
+        logger.debug(f"[KG HTTP] Committed {len(statements)} statements in {len(requests)} requests")
+        return len(statements)
+
+    async def _post_http_transactions(self, requests: List[List[Dict[str, Any]]]):
+        """POST each statement list as its own auto-commit transaction"""
+        url = f"{self._http_url}/db/{self.database}/tx/commit"
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        async with httpx.AsyncClient(auth=self._http_auth, http2=_HTTP2, timeout=None) as client:
+            responses = await asyncio.gather(*(
+                client.post(url, headers=headers,
+                            content=_http_body({"statements": batch}))
+                for batch in requests
+            ))
+        for response in responses:
+            response.raise_for_status()
+            errors = response.json().get("errors")
+            if errors:
+                raise RuntimeError(f"Neo4j HTTP commit failed: {errors}")
+
+    def _write_shard(self, groups: Dict[str, List[Dict[str, Any]]], batch_size: int) -> int:
+        """Run grouped UNWIND queries on a dedicated session (one per worker thread)"""
+        written = 0
+        try:
+            with self.get_session() as session:
+                for query, batch in self._iter_batches(groups, batch_size):
+                    session.execute_write(self._run_bulk, query, batch)
+                    written += len(batch)
+        except Exception as e:
+            logger.error(f"Bulk write failed after {written} rows: {str(e)}")
+            raise
+        return written
+
+    @staticmethod
+    def _run_bulk(tx, query: str, rows: List[Dict[str, Any]]):
+        """Transaction method for UNWIND batch writes"""
+        tx.run(query, rows=rows)
+
     @staticmethod
     def _create_entity(tx, label: str, properties: Dict[str, Any]):
         """Transaction method for entity creation"""
-        query = f"MERGE (n:{label} {{ {', '.join(f'{k}: ${k}' for k in properties)} }})"
-        tx.run(query, **properties)
+        query, key = _ENTITY_QUERIES.get(label, (None, None))
+        if key in properties:
+            tx.run(query, key=properties[key], props=properties)
+        else:
+            tx.run(_entity_query(label, None, tuple(sorted(properties))), props=properties)
 
     @staticmethod
     def _create_relationship(tx, from_label: str, from_key: str, from_value: Any,
                               to_label: str, to_key: str, to_value: Any,
                               rel_type: str, properties: Dict[str, Any]):
         """Transaction method for relationship creation"""
-        prop_str = ', '.join(f'{k}: ${k}' for k in properties) if properties else ''
-        query = f"""
-        MERGE (a:{from_label} {{{from_key}: $from_value}})
-        MERGE (b:{to_label} {{{to_key}: $to_value}})
-        MERGE (a)-[r:{rel_type} {f'{{ {prop_str} }}' if prop_str else ''}]->(b)
-        """
-        params = {"from_value": from_value, "to_value": to_value, **properties}
-        tx.run(query, **params)
+        properties = properties or {}
+        query = _relationship_query(from_label, from_key, to_label, to_key, rel_type, tuple(sorted(properties)))
+        tx.run(query, from_value=from_value, to_value=to_value, props=properties)
 
     def list_existing_relationships(self):
         """Utility: Lists all relationship types in the DB"""
         with self.get_session() as session:
-            results = session.run("CALL db.relationshipTypes()")
+            results = session.run(_REL_TYPES_QUERY)
             return [r["relationshipType"] for r in results]    
 
     def __enter__(self):
@@ -175,14 +688,29 @@ class KGPersistor:
         self.close()
         return False
 
+    async def __aenter__(self):
+        """Allow use in `async with` blocks, which also close the async driver"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the async driver on this loop, then as __exit__()"""
+        await self.aclose()
+        return self.__exit__(exc_type, exc_value, traceback)
+
     def close(self):
-        """Close the Neo4j connection"""
-        if hasattr(self, 'driver') and self.driver:
-            self.driver.close()
+        """
+        Close the Neo4j connection. The async driver is left to aclose(): its
+        connections belong to the event loop that used it, so await aclose()
+        there (or use `async with`) before calling close().
+        """
+        if getattr(self, 'driver', None):
+            self._release_driver()
             logger.info("Neo4j connection closed")
+        if getattr(self, '_async_driver', None) is not None:
+            logger.warning("Async Neo4j driver still open; await aclose() on the event loop that used it")
 
     @staticmethod
-    def _sanitize_properties(props: dict, required: list = []) -> dict:
+    def _sanitize_properties(props: dict, required: frozenset = frozenset()) -> dict:
         """
         Remove fields that are None or empty, unless explicitly required.
 
@@ -191,12 +719,15 @@ class KGPersistor:
             required: Fields to always retain even if empty
 
         Returns:
-            Cleaned dictionary
+            Cleaned dictionary (props itself when nothing needs removing)
         """
-        return {
-            k: v for k, v in props.items()
-            if (v is not None and (not isinstance(v, str) or v.strip())) or (k in required)
-        }
+        drop = [
+            k for k, v in props.items()
+            if (v is None or (isinstance(v, str) and not v.strip())) and k not in required
+        ]
+        if not drop:
+            return props
+        return {k: v for k, v in props.items() if k not in drop}
 
     @staticmethod
     def _validate_entity(label: str, props: dict) -> tuple[bool, dict, list]:
@@ -210,19 +741,13 @@ class KGPersistor:
         Returns:
             Tuple: (is_valid: bool, cleaned_props: dict, error_list: list)
         """
-        required_fields = {
-            "Event": ["timestamp", "event_type"],
-            "Concept": ["text"],
-            "Tag": ["name"],
-            "Asset": ["id"],
-            "Alarm": ["id"],
-            "System": ["name"]
-        }.get(label, [])
-
-        errors = []
-        for field in required_fields:
-            if not props.get(field):
-                errors.append(f"Missing required '{field}'")
+        required_fields = _REQUIRED_FIELDS.get(label, frozenset())
+
+        errors = [
+            f"Missing required '{field}'"
+            for field in sorted(required_fields)
+            if not props.get(field)
+        ]
 
         cleaned = KGPersistor._sanitize_properties(props, required_fields)
         return (not errors, cleaned, errors)
@@ -5,33 +5,88 @@ NER-powered entity extractor for industrial text using local spaCy model
 """
 
 import spacy
-from typing import Dict, List
+import yaml
+from functools import lru_cache
+from spacy.matcher import PhraseMatcher
+from typing import Dict, Iterable, List
+import d_config.demo_settings as settings
 
 # Load local spaCy NER model
 # Ensure the model is already installed at this path or linked using spacy link
 MODEL_PATH = "en_core_web_sm"
+BATCH_SIZE = 64
 try:
-    nlp = spacy.load(MODEL_PATH)
+    # Neither extractor uses dependency parses or lemmas
+    nlp = spacy.load(MODEL_PATH, disable=["parser", "lemmatizer"])
 except Exception as e:
     raise RuntimeError(f"Failed to load spaCy model from {MODEL_PATH}: {str(e)}")
 
+STOPWORDS = nlp.Defaults.stop_words
+KEYWORD_POS = {"NOUN", "PROPN"}
+
+# Components each extractor can skip. NER carries its own tok2vec layer, so
+# entity extraction needs nothing else; keywords need tagger + attribute_ruler for POS.
+_NER_SKIP = [p for p in ("tok2vec", "tagger", "attribute_ruler") if p in nlp.pipe_names]
+_KEYWORD_SKIP = [p for p in ("ner",) if p in nlp.pipe_names]
+
 
 def extract_entities(text: str) -> Dict[str, List[str]]:
     """Extracts entities from a given description or log line."""
-    doc = nlp(text)
-    entity_map = {}
-    for ent in doc.ents:
-        label = ent.label_.lower()
-        if label not in entity_map:
-            entity_map[label] = []
-        entity_map[label].append(ent.text.strip())
-    return entity_map
+    return extract_entities_batch([text])[0]
+
+
+def extract_entities_batch(texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+    """Batched extract_entities(): one nlp.pipe() pass running only the NER component."""
+    if settings.NER_BACKEND == "matcher":
+        return _match_entities_batch(texts)
+    results = []
+    for doc in nlp.pipe(texts, batch_size=BATCH_SIZE, disable=_NER_SKIP):
+        entity_map = {}
+        for ent in doc.ents:
+            entity_map.setdefault(ent.label_.lower(), []).append(ent.text.strip())
+        results.append(entity_map)
+    return results
+
+
+@lru_cache(maxsize=1)
+def _phrase_matcher() -> PhraseMatcher:
+    """
+    Case-insensitive PhraseMatcher over the asset terms and relation keywords
+    in the rule file, keyed by asset type / relation name.
+    """
+    with open(settings.RELATION_RULES_PATH, "r") as f:
+        rules = yaml.safe_load(f) or {}
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for section in ("assets", "verbs"):
+        for label, terms in (rules.get(section) or {}).items():
+            if terms:
+                matcher.add(label.lower(), list(nlp.tokenizer.pipe(terms)))
+    return matcher
+
+
+def _match_entities_batch(texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+    """Dictionary lookup instead of statistical NER: tokenizer + PhraseMatcher only."""
+    matcher = _phrase_matcher()
+    results = []
+    for doc in nlp.tokenizer.pipe(texts, batch_size=BATCH_SIZE):
+        entity_map = {}
+        for match_id, start, end in matcher(doc):
+            entity_map.setdefault(nlp.vocab.strings[match_id], []).append(doc[start:end].text)
+        results.append(entity_map)
+    return results
 
 
 def extract_flat_keywords(text: str) -> List[str]:
     """Returns list of keywords (nouns/proper nouns) in lowercase for fallback."""
-    doc = nlp(text)
-    return [token.text.lower() for token in doc if token.pos_ in {"NOUN", "PROPN"} and not token.is_stop]
+    return extract_flat_keywords_batch([text])[0]
+
+
+def extract_flat_keywords_batch(texts: Iterable[str]) -> List[List[str]]:
+    """Batched extract_flat_keywords(): one nlp.pipe() pass without the NER component."""
+    return [
+        [token.lower_ for token in doc if token.pos_ in KEYWORD_POS and token.lower_ not in STOPWORDS]
+        for doc in nlp.pipe(texts, batch_size=BATCH_SIZE, disable=_KEYWORD_SKIP)
+    ]
 
 
 if __name__ == "__main__":
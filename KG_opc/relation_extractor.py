@@ -1,32 +1,110 @@
 import yaml
 import logging
-from typing import Dict, List
+import os
+import string
+from typing import Any, Dict, List
 import re
 import pandas as pd
 
+try:
+    import orjson  # Optional: faster loads/dumps for the parsed-rules cache
+except ImportError:
+    orjson = None
+    import json
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 logger = logging.getLogger("relation.extractor")
 
+# One bit per lowercase letter / digit, for the keyword prefilter in infer()
+_CHAR_BITS = {c: 1 << i for i, c in enumerate(string.ascii_lowercase + string.digits)}
+
+
+def _char_mask(text: str) -> int:
+    """Bitmask of the letters/digits occurring in (lowercase) text."""
+    mask = 0
+    for c in set(text).intersection(_CHAR_BITS):
+        mask |= _CHAR_BITS[c]
+    return mask
+
+
 class IndustrialRelationExtractor:
     def __init__(self, rule_file: str):
         self.rule_file = rule_file
         self.relations = {}
         self.asset_rules = {}
         self.fallback = "RELATED_TO"
+        self._relation_patterns = []
+        self._asset_patterns = {}
         self._load_rules()
         self.context = None
         self.asset_context = {}
 
     def _load_rules(self):
         try:
-            with open(self.rule_file, "r") as f:
-                rules = yaml.safe_load(f)
-                self.relations = rules.get("verbs", {})
-                self.asset_rules = rules.get("assets", {})
-                self.fallback = rules.get("fallback", "RELATED_TO")
+            rules = self._read_rules()
+            # Keywords are matched against lowercased phrases
+            self.relations = {
+                relation: [kw.lower() for kw in keywords or []]
+                for relation, keywords in (rules.get("verbs") or {}).items()
+            }
+            self.asset_rules = {
+                asset: [term.lower() for term in terms or []]
+                for asset, terms in (rules.get("assets") or {}).items()
+            }
+            self.fallback = rules.get("fallback", "RELATED_TO")
+            self._compile_patterns()
             logger.info("[RelationExtractor] Loaded rules from YAML")
         except Exception as e:
             logger.error(f"Failed to load relation rules: {e}")
 
+    def _read_rules(self) -> Dict[str, Any]:
+        """
+        Parse the YAML rule file, or reuse the JSON sidecar cache written
+        next to it when that is at least as new as the rule file.
+        """
+        cache_file = self.rule_file + ".cache.json"
+        try:
+            if os.stat(cache_file).st_mtime >= os.stat(self.rule_file).st_mtime:
+                with open(cache_file, "rb") as f:
+                    data = f.read()
+                return orjson.loads(data) if orjson else json.loads(data)
+        except (OSError, ValueError):
+            pass  # No usable cache, parse the YAML
+
+        with open(self.rule_file, "r") as f:
+            rules = yaml.load(f, Loader=_YamlLoader) or {}
+        try:
+            with open(cache_file, "wb") as f:
+                f.write(orjson.dumps(rules) if orjson else json.dumps(rules).encode())
+        except (OSError, TypeError) as e:
+            logger.debug(f"[RelationExtractor] Rule cache not written: {e}")
+        return rules
+
+    def _compile_patterns(self):
+        """
+        Precompile one alternation per relation (word-bounded keywords, in
+        rule order) and one per asset type (plain substrings), so infer()
+        runs a single regex scan per rule instead of one per keyword.
+        Each pattern carries the character masks of its keywords; a rule is
+        only searched if one keyword's characters all occur in the phrase.
+        """
+        self._relation_patterns = [
+            (relation,
+             re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b"),
+             frozenset(map(_char_mask, keywords)))
+            for relation, keywords in self.relations.items()
+            if keywords
+        ]
+        self._asset_patterns = {
+            asset: (re.compile("|".join(map(re.escape, terms))), frozenset(map(_char_mask, terms)))
+            for asset, terms in self.asset_rules.items()
+            if terms
+        }
+
     def set_context(self, asset_type: str):
         self.context = asset_type.lower()
         logger.debug(f"[RelationExtractor] Context set to '{self.context}'")
@@ -34,18 +112,19 @@ class IndustrialRelationExtractor:
     def infer(self, phrase: str) -> str:
         """Infer relation based on keywords and asset type."""
         phrase_lower = phrase.lower()
+        missing = ~_char_mask(phrase_lower)  # Characters absent from the phrase
 
         # Try asset-based terms first
-        if self.context in self.asset_rules:
-            for related_term in self.asset_rules[self.context]:
-                if related_term.lower() in phrase_lower:
-                    return "PART_OF"
+        asset_rule = self._asset_patterns.get(self.context)
+        if asset_rule:
+            pattern, masks = asset_rule
+            if any(not mask & missing for mask in masks) and pattern.search(phrase_lower):
+                return "PART_OF"
 
         # Check for verb-based relations
-        for relation, keywords in self.relations.items():
-            for keyword in keywords:
-                if re.search(rf"\b{re.escape(keyword)}\b", phrase_lower):
-                    return relation
+        for relation, pattern, masks in self._relation_patterns:
+            if any(not mask & missing for mask in masks) and pattern.search(phrase_lower):
+                return relation
 
         return self.fallback
 
@@ -54,30 +133,24 @@ class IndustrialRelationExtractor:
         Create static relationship candidates from plant metadata
         Useful to populate KG before live events arrive
         """
-        relations = []
-        for _, row in tag_metadata.iterrows():
-            tag = row.get("Tag Name") or row.get("Attribute")
-            system = row.get("System")
-            category = row.get("Category")
-            unit = row.get("Engineering Units") or row.get("Unit")
-
-            if tag and system:
-                relations.append({
-                    "from": tag,
-                    "to": system,
-                    "type": "PART_OF"
-                })
-            if tag and category:
-                relations.append({
-                    "from": tag,
-                    "to": category,
-                    "type": "IS_TYPE"
-                })
-            if tag and unit:
-                relations.append({
-                    "from": tag,
-                    "to": unit,
-                    "type": "MEASURES"
-                })
-
-        return relations
+        tag = self._first_present(tag_metadata, "Tag Name", "Attribute")
+        targets = (
+            ("PART_OF", self._first_present(tag_metadata, "System")),
+            ("IS_TYPE", self._first_present(tag_metadata, "Category")),
+            ("MEASURES", self._first_present(tag_metadata, "Engineering Units", "Unit")),
+        )
+        frames = [
+            pd.DataFrame({"from": tag, "to": target, "type": rel_type}).dropna()
+            for rel_type, target in targets
+        ]
+        return pd.concat(frames, ignore_index=True).to_dict("records")
+
+    @staticmethod
+    def _first_present(df: pd.DataFrame, *columns: str) -> pd.Series:
+        """Row-wise first non-empty value across columns; missing columns are skipped."""
+        result = pd.Series(index=df.index, dtype=object)
+        for column in columns:
+            if column in df.columns:
+                values = df[column]
+                result = result.fillna(values.where(values != ""))
+        return result
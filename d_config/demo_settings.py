@@ -119,6 +119,8 @@ NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USERNAME = os.getenv('NEO4J_USERNAME', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'Password123')  # Critical: Set via env
 NEO4J_DATABASE = os.getenv('NEO4J_DATABASE', 'neo4j')
+NEO4J_HTTP_URL = os.getenv('NEO4J_HTTP_URL')  # e.g. http://localhost:7474, enables HTTP bulk loads
+NEO4J_MAX_POOL_SIZE = int(os.getenv('NEO4J_MAX_POOL_SIZE', '100'))
 
 # InfluxDB
 INFLUXDB_URL = os.getenv('INFLUXDB_URL', 'http://localhost:8086')
@@ -131,6 +133,10 @@ CHUNK_SIZE_SECONDS = int(os.getenv('CHUNK_SIZE_SECONDS', '300'))
 CHUNK_OVERLAP_SECONDS = int(os.getenv('CHUNK_OVERLAP_SECONDS', '0'))
 MAX_BATCH_RECORDS = int(os.getenv('MAX_BATCH_RECORDS', '1000'))
 
+# --- NLP ---
+NER_BACKEND = os.getenv('NER_BACKEND', 'spacy').lower()  # spacy | matcher
+RELATION_RULES_PATH = os.getenv('RELATION_RULES_PATH', os.path.join(BASE_DIR, 'relation_rules.yaml'))
+
 # --- SSL Certificates ---
 SSL_CERT_PATHS = {
     'kafka': os.getenv('KAFKA_SSL_CA_PATH', os.path.abspath(os.path.join(BASE_DIR, '..', 'opc_certs', 'kafka-ca.pem'))),#'/etc/ssl/certs/kafka-ca.pem'),
@@ -171,6 +177,9 @@ def validate_config() -> None:
     if not 1 <= MQTT_BROKER_PORT <= 65535:
         errors.append(f"Invalid MQTT_BROKER_PORT: {MQTT_BROKER_PORT}")
 
+    if NER_BACKEND not in {'spacy', 'matcher'}:
+        errors.append(f"Invalid NER_BACKEND: '{NER_BACKEND}'")
+
     # --- MODIFICATION FOR TESTING ---
     # Skipping actual file existence check for SSL certs in testing mode
     # since these files won't exist locally without a full setup.
@@ -8,11 +8,86 @@ Changes:
 """
 
 import logging
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit  # Optional: compiled semantic boundary scan
+except ImportError:
+    njit = None
 
 logger = logging.getLogger("pipeline.chunker")
 
+
+def _scan_boundaries(ts, first_window, window, max_batch, values, present, tracked):
+    """
+    Compiled equivalent of the chunk_data() loop with the default
+    _should_start_new_chunk(). Returns the end index of every chunk.
+
+    ts: int64 ns timestamps (sorted); values/present/tracked: (records, tags)
+    float value, tag-in-record and tag-is-numeric-in-record matrices.
+    """
+    n, n_tags = values.shape
+    cuts = np.empty(n, dtype=np.int64)
+    sums = np.zeros(n_tags)
+    n_cuts = 0
+    start = 0
+    limit_width = first_window
+    while start < n:
+        limit = ts[start] + limit_width
+        stop = min(start + max_batch, n)
+        for t in range(n_tags):
+            sums[t] = values[start, t] if tracked[start, t] else 0.0
+        count = 1
+        end = start + 1
+        while end < stop and ts[end] < limit:
+            boundary = False
+            for t in range(n_tags):
+                if tracked[start, t] and present[end, t]:
+                    avg = sums[t] / count
+                    if abs(values[end, t] - avg) > avg * 0.1:
+                        boundary = True
+                        break
+            if boundary:
+                break
+            for t in range(n_tags):
+                if tracked[start, t] and present[end, t]:
+                    sums[t] += values[end, t]
+            count += 1
+            end += 1
+        cuts[n_cuts] = end
+        n_cuts += 1
+        start = end
+        limit_width = window
+    return cuts[:n_cuts]
+
+
+_scan_boundaries_jit = njit(cache=True, nogil=True)(_scan_boundaries) if njit else None
+
+
+class _ChunkStats:
+    """Running per-tag sums of the chunk being built (semantic boundary check)."""
+
+    __slots__ = ("numeric_tags", "tag_sums", "count")
+
+    def __init__(self, first_record: Dict[str, Any]):
+        # Only check numeric tags, as seen in the chunk's first record
+        self.numeric_tags: Tuple[str, ...] = tuple(
+            k for k, v in first_record["tags"].items() if isinstance(v, (int, float))
+        )
+        self.tag_sums: Dict[str, float] = dict.fromkeys(self.numeric_tags, 0.0)
+        self.count = 0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Adds a record to the running sums."""
+        tags = record["tags"]
+        for tag in self.numeric_tags:
+            if tag in tags:
+                self.tag_sums[tag] += tags[tag]
+        self.count += 1
+
 class DataChunker:
     """Time-based chunking with KG metadata support."""
 
@@ -33,42 +108,73 @@ class DataChunker:
         source_id: str
     ) -> List[Dict[str, Any]]:
         """Main chunking interface with KG metadata support."""
+        return list(self.iter_chunks(processed_data, source_id))
+
+    def iter_chunks(
+        self,
+        processed_data: List[Dict[str, Any]],
+        source_id: str
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generator form of chunk_data(): yields each chunk as soon as its
+        boundary is known, so consumers can start before chunking finishes.
+        """
         if not processed_data:
             logger.warning("Received empty dataset - skipping chunking")
-            return []
+            return
 
         if len(processed_data) > 10_000:  # Prevent OOM
             logger.warning("Large dataset detected - truncating to 10k records")
             processed_data = processed_data[:10_000]
             
         try:
-            sorted_data = self._sort_records(processed_data)
-            chunks = []
-            current_chunk = []
-            window_end = None
+            records, times = self._sort_records(processed_data)
+            py_times = times.to_pydatetime()
+            n_chunks = 0
 
-            for record in sorted_data:
-                timestamp = self._parse_timestamp(record["timestamp"])
+            cuts = self._compiled_boundaries(records, times)
+            if cuts is not None:
+                start = 0
+                for end in cuts.tolist():
+                    yield self._finalize_chunk(records[start:end], source_id, py_times[start:end])
+                    n_chunks += 1
+                    start = end
+                logger.debug(f"Created {n_chunks} chunks")
+                return
 
-                if window_end is None:
-                    window_end = timestamp + self.chunk_size
+            ts = times.values  # datetime64, UTC for tz-aware input
+            start = 0
+            # Chunk statistics stay local so concurrent iterations don't share them
+            if type(self)._should_start_new_chunk is DataChunker._should_start_new_chunk:
+                should_split = self._should_start_new_chunk
+            else:  # Overrides keep the two-argument signature
+                should_split = lambda chunk, record, stats: self._should_start_new_chunk(chunk, record)
+            window = np.timedelta64(self.chunk_size)
+
+            while start < len(records):
+                # Time window and batch size bound the chunk; one binary search
+                # finds the first record at or past this chunk's window end
+                stop = min(
+                    int(np.searchsorted(ts, ts[start] + window, side="left")),
+                    start + self.max_batch
+                )
+                current_chunk = [records[start]]
+                stats = _ChunkStats(records[start])
+                stats.add(records[start])
 
                 # --- APPROVED CHANGE: Semantic boundary check ---
-                if (timestamp >= window_end or 
-                    len(current_chunk) >= self.max_batch or
-                    self._should_start_new_chunk(current_chunk, record)):
-                    if current_chunk:
-                        chunks.append(self._finalize_chunk(current_chunk, source_id))
-                    current_chunk = [record]
-                    window_end = timestamp + self.chunk_size - self.overlap
-                else:
-                    current_chunk.append(record)
-
-            if current_chunk:
-                chunks.append(self._finalize_chunk(current_chunk, source_id))
-
-            logger.debug(f"Created {len(chunks)} chunks")
-            return chunks
+                end = start + 1
+                while end < stop and not should_split(current_chunk, records[end], stats):
+                    stats.add(records[end])
+                    current_chunk.append(records[end])
+                    end += 1
+
+                yield self._finalize_chunk(current_chunk, source_id, py_times[start:end])
+                n_chunks += 1
+                start = end
+                window = np.timedelta64(self.chunk_size - self.overlap)
+
+            logger.debug(f"Created {n_chunks} chunks")
 
         except Exception as e:
             logger.error(f"Chunking failed: {str(e)}", exc_info=True)
@@ -78,42 +184,92 @@ class DataChunker:
     def _should_start_new_chunk(
         self, 
         current_chunk: List[Dict[str, Any]], 
-        new_record: Dict[str, Any]
+        new_record: Dict[str, Any],
+        stats: Optional[_ChunkStats] = None
     ) -> bool:
         """
         Determines if a semantic boundary exists between records.
         Default implementation checks for >10% value deviation in numeric tags.
+        `stats` are current_chunk's running sums, computed here if not given.
         """
         if not current_chunk:
             return False
 
-        # Only check numeric tags
-        numeric_tags = {
-            k: v for k, v in current_chunk[0]["tags"].items()
-            if isinstance(v, (int, float))
-        }
-
-        for tag, value in numeric_tags.items():
-            if tag in new_record["tags"]:
-                avg = sum(r["tags"][tag] for r in current_chunk) / len(current_chunk)
-                new_val = new_record["tags"][tag]
+        if stats is None:
+            stats = _ChunkStats(current_chunk[0])
+            for record in current_chunk:
+                stats.add(record)
+        new_tags = new_record["tags"]
+        for tag in stats.numeric_tags:
+            if tag in new_tags:
+                avg = stats.tag_sums[tag] / stats.count
+                new_val = new_tags[tag]
                 if abs(new_val - avg) > avg * 0.1:  # 10% deviation threshold
                     return True
         return False
 
+    def _compiled_boundaries(
+        self,
+        records: List[Dict[str, Any]],
+        times: pd.DatetimeIndex
+    ) -> Optional[np.ndarray]:
+        """
+        Chunk end indices from the numba kernel, or None when the Python
+        loop must be used: numba missing, _should_start_new_chunk()
+        overridden, or a tag that is numeric in some records but not others.
+        Tags that are never numeric are never checked, so they are left out.
+        """
+        if (_scan_boundaries_jit is None
+                or type(self)._should_start_new_chunk is not DataChunker._should_start_new_chunk):
+            return None
+
+        numeric: Dict[str, bool] = {}
+        for r in records:
+            for tag, v in r["tags"].items():
+                is_numeric = isinstance(v, (int, float))
+                if numeric.setdefault(tag, is_numeric) is not is_numeric:
+                    return None
+        columns = {tag: j for j, tag in enumerate(t for t, num in numeric.items() if num)}
+
+        values = np.zeros((len(records), len(columns)))
+        present = np.zeros(values.shape, dtype=np.bool_)
+        for i, r in enumerate(records):
+            for tag, v in r["tags"].items():
+                j = columns.get(tag)
+                if j is not None:
+                    values[i, j] = v
+                    present[i, j] = True
+
+        us = timedelta(microseconds=1)
+        return _scan_boundaries_jit(
+            times.values.astype("datetime64[ns]").view(np.int64),
+            self.chunk_size // us * 1000,
+            (self.chunk_size - self.overlap) // us * 1000,
+            self.max_batch,
+            values,
+            present,
+            present  # every column is numeric wherever it is present
+        )
+
     def _finalize_chunk(
         self,
         records: List[Dict[str, Any]],
-        source_id: str
+        source_id: str,
+        timestamps: Optional[Sequence[datetime]] = None
     ) -> Dict[str, Any]:
-        """Finalizes chunk with KG-ready metadata."""
-        timestamps = [self._parse_timestamp(r["timestamp"]) for r in records]
+        """
+        Finalizes chunk with KG-ready metadata.
+        `timestamps` are the already parsed record timestamps, if known.
+        """
+        if timestamps is None:
+            timestamps = [self._parse_timestamp(r["timestamp"]) for r in records]
+        chunk_start = min(timestamps)
         chunk_metadata = {
-            "chunk_start": min(timestamps).isoformat(),
+            "chunk_start": chunk_start.isoformat(),
             "chunk_end": max(timestamps).isoformat(),
             "record_count": len(records),
             "processing_stage": "chunked",
-            "chunk_id": f"{source_id}_{min(timestamps).timestamp()}",
+            "chunk_id": f"{source_id}_{chunk_start.timestamp()}",
             # --- APPROVED CHANGE: KG metadata ---
             "kg_ready": {
                 "entity_types": list({
@@ -130,22 +286,32 @@ class DataChunker:
             "metadata": chunk_metadata
         }
 
-    # --- Existing helper methods (unchanged) ---
-    def _sort_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Sorts records by timestamp with error handling."""
+    # --- Existing helper methods ---
+    def _sort_records(
+        self,
+        records: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], pd.DatetimeIndex]:
+        """
+        Sorts records by timestamp with error handling.
+        Timestamps are parsed in one vectorized pass and sorted with a stable
+        argsort; returns the sorted records and their parsed timestamps.
+        """
+        raw = [r["timestamp"] for r in records]
         try:
-            return sorted(
-                records,
-                key=lambda x: (
-                    datetime.fromisoformat(x["timestamp"])
-                    if isinstance(x["timestamp"], str)
-                    else x["timestamp"]
-                )
-            )
+            try:
+                times = pd.to_datetime(raw, format="ISO8601")
+            except ValueError:
+                # Mixed UTC offsets: compare on a common timezone
+                times = pd.to_datetime(raw, format="ISO8601", utc=True)
+            if times.hasnans:
+                raise ValueError("Missing timestamp")
         except Exception as e:
             logger.error(f"Sorting failed: {str(e)}")
             raise ValueError("Invalid timestamp format")
 
+        order = np.argsort(times.values, kind="stable")
+        return [records[i] for i in order], times[order]
+
     def _parse_timestamp(self, ts: Any) -> datetime:
         """Safely converts timestamp to datetime."""
         if isinstance(ts, datetime):
@@ -3,22 +3,102 @@ data_reader.py
 Type-Safe Enterprise OPC UA Data Reader
 """
 
+import asyncio
 import json
 import csv
 import logging
-from datetime import timezone
 import time
 import os
+import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterator, Dict, Any, Optional, Union, TypedDict
-from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, Dict, Any, Optional, Tuple, Union, TypedDict
+import numpy as np
 import pandas as pd
 from retrying import retry
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+try:
+    from orjson import loads as _json_loads  # Optional: parses bytes lines without decoding
+except ImportError:
+    _json_loads = json.loads
+try:
+    import fastjsonschema  # Optional: code-generated record validator
+except ImportError:
+    fastjsonschema = None
+try:
+    from asyncua import Client as AsyncUAClient, ua  # Optional: push-based OPC UA subscriptions
+except ImportError:
+    AsyncUAClient = None
 from d_config import demo_settings as settings
 # from opcua import Client, Subscription # MODIFICATION FOR TESTING: Commented out
 
 logger = logging.getLogger("pipeline.reader")
 
+CSV_BLOCK_SIZE = 8 << 20
+PARQUET_BATCH_SIZE = 65536
+JSONL_BUFFER_SIZE = 1 << 20
+OPCUA_QUEUE_SIZE = 1024
+PLANT_CONFIG_PATH = "plant_data/plant_config.csv"
+
+# ISO 8601 date, optional time and UTC offset: the shapes fromisoformat() accepts,
+# with each field range-checked (day 31 is not checked against the month)
+_ISO_TIMESTAMP = (
+    r"^\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])"
+    r"(?:[T ](?:[01]\d|2[0-3])(?::[0-5]\d(?::[0-5]\d(?:\.\d+)?)?)?"
+    r"(?:Z|[+-](?:[01]\d|2[0-3])(?::?[0-5]\d)?)?)?$"
+)
+_ISO_TIMESTAMP_RE = re.compile(_ISO_TIMESTAMP)
+
+# Field -> check, in the order errors are reported
+_OPC_REQUIRED = {
+    'timestamp': lambda x: isinstance(x, str) and bool(_ISO_TIMESTAMP_RE.match(x)),
+    'source_id': lambda x: isinstance(x, str),
+    'tags': lambda x: isinstance(x, dict)
+}
+_OPC_SCHEMA = {
+    "type": "object",
+    "required": ["timestamp", "source_id", "tags"],
+    "properties": {
+        "timestamp": {"type": "string", "pattern": _ISO_TIMESTAMP},
+        "source_id": {"type": "string"},
+        "tags": {"type": "object"}
+    }
+}
+_check_opc_schema = fastjsonschema.compile(_OPC_SCHEMA) if fastjsonschema else None
+
+_utc_second = (-1, "")  # (epoch second, its "%Y-%m-%dT%H:%M:%S" rendering)
+
+
+def _utc_now_iso() -> str:
+    """
+    Same string as datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+    but the date/time part is only formatted once per second.
+    """
+    global _utc_second
+    sec, ns = divmod(time.time_ns(), 1_000_000_000)
+    cached_sec, prefix = _utc_second
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _utc_second = (sec, prefix)
+    return f"{prefix}.{ns // 1000:06d}+00:00"
+
+
+def _non_null(pairs: Iterable[Tuple[str, float]]) -> Dict[str, float]:
+    """Tag dict from (tag, value) pairs, skipping NaN readings"""
+    return {tag: val for tag, val in pairs if val == val}  # NaN != NaN
+
+
+@lru_cache(maxsize=8)
+def _load_tag_set(path: str, mtime: float) -> frozenset:
+    """Tag names in a plant config CSV; mtime is part of the key so edits invalidate"""
+    return frozenset(pd.read_csv(path, usecols=["Tag Name"])["Tag Name"].unique())
+
+
 # --- MODIFICATION FOR TESTING ---
 # Mock opcua.Client and Subscription for testing without a real OPC UA server
 class MockNode:
@@ -31,11 +111,12 @@ class MockSubscription:
     def __init__(self, publishing_interval, priority):
         self.publishing_interval = publishing_interval
         self.priority = priority
-        self._subscribed_node_ids = []
+        self._subscribed_node_ids = ()  # Fixed once subscribing is done; polled far more often
+        self._tick = 0
         logging.getLogger("pipeline.reader").info(f"MockSubscription created with interval={publishing_interval}, priority={priority}")
 
     def subscribe_data_change(self, node_id):
-        self._subscribed_node_ids.append(node_id)
+        self._subscribed_node_ids += (node_id,)
         logging.getLogger("pipeline.reader").info(f"MockSubscription: Subscribed to {node_id}")
 
     def get_published_data(self):
@@ -48,8 +129,9 @@ class MockSubscription:
         
         # Cycle through subscribed nodes to simulate data from different sources
         # Or, just return a fixed dummy for basic connectivity test
-        dummy_node_id = self._subscribed_node_ids[0] if self._subscribed_node_ids else "ns=4;s=test_node_1"
-        dummy_value = 123.45 + (datetime.now().second % 10) # Change value slightly
+        dummy_node_id = self._subscribed_node_ids[0]
+        self._tick = (self._tick + 1) % 10
+        dummy_value = 123.45 + self._tick # Change value slightly, without reading the clock
         return MockNode(dummy_node_id, dummy_value)
 
 class MockClient:
@@ -77,6 +159,53 @@ class MockClient:
 # --- END MODIFICATION ---
 
 
+class _OPCRecord:
+    """
+    Single-tag OPC UA reading as it waits in the subscription queue.
+    Turned into the reader's record dict only when it is yielded.
+    """
+    __slots__ = ("timestamp", "source_id", "tag_name", "value")
+
+    def __init__(self, timestamp: str, source_id: str, tag_name: str, value: float):
+        self.timestamp = timestamp
+        self.source_id = source_id
+        self.tag_name = tag_name
+        self.value = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'timestamp': self.timestamp,
+            'source_id': self.source_id,
+            'tags': {self.tag_name: self.value}
+        }
+
+
+class _SubscriptionHandler:
+    """asyncua subscription handler: puts data changes on an asyncio.Queue as _OPCRecords"""
+
+    def __init__(self, reader: "OPCDataReader", queue: asyncio.Queue):
+        self._reader = reader
+        self._queue = queue
+
+    def datachange_notification(self, node, val, data):
+        # Called on the event loop thread, so put_nowait() needs no locking
+        node_id = node.nodeid.to_string()
+        try:
+            record = _OPCRecord(_utc_now_iso(), node_id, node_id.split('.')[-1], float(val))
+        except (TypeError, ValueError) as e:
+            self._reader._metrics['records_failed'] += 1
+            logger.warning(f"OPC UA format error: {str(e)}")
+            return
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._reader._metrics['records_failed'] += 1
+            logger.warning(f"OPC UA queue full, dropped update from {node_id}")
+
+    def status_change_notification(self, status):
+        logger.warning(f"OPC UA subscription status changed: {status}")
+
+
 class OPCUAConfig(TypedDict):
     endpoint: str
     node_ids: list[str]
@@ -94,6 +223,14 @@ class OPCDataReader:
             'last_error': None,
             'source_type': self._detect_source_type()
         }
+        # The source cannot change after construction, so dispatch is bound once
+        self._read_impl = self._read_file if self._metrics['source_type'] == 'file' else self._read_opcua_stream
+        self._file_readers = {
+            '.jsonl': self._read_jsonl,
+            '.json': self._read_json,
+            '.csv': self._read_csv,
+            '.parquet': self._read_parquet
+        }
 
     def _detect_source_type(self) -> str:
         """Type-guarded source detection"""
@@ -106,26 +243,65 @@ class OPCDataReader:
     @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000)
     def read_records(self) -> Iterator[Dict[str, Any]]:
         """Main type-safe interface"""
-        if self._metrics['source_type'] == 'file':
-            yield from self._read_file()
-        else:
-            yield from self._read_opcua_stream()
+        yield from self._read_impl()
+
+    async def read_records_async(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async interface: OPC UA records are pushed by subscription callbacks
+        (asyncua) instead of polled. Files, and OPC UA without asyncua, are
+        read by the sync generator on a worker thread.
+        """
+        if self._metrics['source_type'] == 'opcua' and AsyncUAClient is not None:
+            async for record in self._read_opcua_subscription():
+                yield record
+            return
+
+        records = self.read_records()
+        while (record := await asyncio.to_thread(next, records, None)) is not None:
+            yield record
+
+    async def _read_opcua_subscription(self) -> AsyncIterator[Dict[str, Any]]:
+        """Streams data changes for the configured nodes until the consumer stops"""
+        if not isinstance(self.source, dict):
+            raise TypeError("OPC UA source must be a config dict")
+        node_ids = self.source.get('node_ids', [])
+        if not isinstance(node_ids, list):
+            raise TypeError("node_ids must be a list")
+
+        client = AsyncUAClient(self.source.get('endpoint', ''))
+        if settings.TLS_MUTUAL_AUTH:
+            await client.set_security_string(
+                f"Basic256Sha256,SignAndEncrypt,{settings.TLS_CLIENT_CERT},{settings.TLS_CLIENT_KEY}"
+            )
+        queue: asyncio.Queue = asyncio.Queue(maxsize=OPCUA_QUEUE_SIZE)
+        params = ua.CreateSubscriptionParameters(
+            RequestedPublishingInterval=self.source.get('publishing_interval', 500),
+            RequestedLifetimeCount=10000,
+            RequestedMaxKeepAliveCount=3000,
+            MaxNotificationsPerPublish=10000,
+            PublishingEnabled=True,
+            Priority=self.source.get('priority', 100)
+        )
+        async with client:
+            sub = await client.create_subscription(params, _SubscriptionHandler(self, queue))
+            try:
+                await sub.subscribe_data_change([client.get_node(node_id) for node_id in node_ids])
+                while True:
+                    record = await queue.get()
+                    self._metrics['records_processed'] += 1
+                    yield record.to_dict()
+            finally:
+                await sub.delete()
 
     def _read_file(self) -> Iterator[Dict[str, Any]]:
         """Type-safe file reading"""
         path = Path(self.source) if isinstance(self.source, str) else Path()
         try:
             suffix = path.suffix.lower()
-            if suffix == '.jsonl':
-                yield from self._read_jsonl(path)
-            elif suffix == '.json':
-                yield from self._read_json(path)
-            elif suffix == '.csv':
-                yield from self._read_csv(path)
-            elif suffix == '.parquet':
-                yield from self._read_parquet(path)
-            else:
+            reader = self._file_readers.get(suffix)
+            if reader is None:
                 raise ValueError(f"Unsupported file format: {suffix}")
+            yield from reader(path)
         except Exception as e:
             logger.error(f"File read failed: {str(e)}")
             self._metrics['last_error'] = str(e)
@@ -133,10 +309,10 @@ class OPCDataReader:
 
     def _read_jsonl(self, path: Path) -> Iterator[Dict[str, Any]]:
         """Type-checked JSONL reader"""
-        with open(path, 'r') as f:
+        with open(path, 'rb', buffering=JSONL_BUFFER_SIZE) as f:
             for line in f:
                 try:
-                    record = json.loads(line)
+                    record = _json_loads(line)
                     if self._validate_opc_structure(record):
                         self._metrics['records_processed'] += 1
                         yield record
@@ -166,50 +342,83 @@ class OPCDataReader:
         - Loads tag structure from plant_config
         """
         try:
-            df = pd.read_csv(path)
+            df = self._load_csv_frame(path)
 
             # Load expected tag list from metadata
             try:
-                tag_list = pd.read_csv("plant_data/plant_config.csv")["Tag Name"].unique().tolist()
+                tag_set = _load_tag_set(PLANT_CONFIG_PATH, os.path.getmtime(PLANT_CONFIG_PATH))
             except Exception as e:
                 logger.warning(f"[CSV Reader] plant_config.csv missing or malformed: {e}")
-                tag_list = []
+                tag_set = frozenset()
 
             if set(["timestamp", "Tag Name", "Value"]).issubset(df.columns):
-                # Long format: pivot by timestamp
-                grouped = df[df["Tag Name"].isin(tag_list)].groupby("timestamp")
-                for ts, group in grouped:
-                    tags = {
-                        row["Tag Name"]: float(row["Value"])
-                        for _, row in group.iterrows()
-                        if pd.notnull(row["Value"])
-                    }
-                    record = {"timestamp": ts, "source_id": "CSV_LONG", "tags": tags}
-                    if self._validate_opc_structure(record):
-                        self._metrics['records_processed'] += 1
-                        yield record
+                # Long format: one record per timestamp. A stable sort keeps file
+                # order within each timestamp, so the last reading of a tag wins
+                sub = df.loc[
+                    df["Tag Name"].isin(tag_set) & df["timestamp"].notna(), ["timestamp", "Tag Name", "Value"]
+                ].sort_values("timestamp", kind="stable")
+                if len(sub):
+                    ts = sub["timestamp"].to_numpy()
+                    names = sub["Tag Name"].tolist()
+                    vals = sub["Value"].astype(float).tolist()
+                    bounds = np.flatnonzero(np.r_[True, ts[1:] != ts[:-1], True]).tolist()
+                    yield from self._emit_csv_rows(
+                        ((ts[s], _non_null(zip(names[s:e], vals[s:e]))) for s, e in zip(bounds, bounds[1:])),
+                        "CSV_LONG"
+                    )
             else:
                 # Wide format: treat each row as one snapshot
-                for _, row in df.iterrows():
-                    timestamp = row.get("timestamp")
-                    tags = {
-                        col: float(val)
-                        for col, val in row.items()
-                        if col not in ["timestamp", "source_id"] and pd.notnull(val) and col in tag_list
-                    }
-                    record = {"timestamp": timestamp, "source_id": "CSV_WIDE", "tags": tags}
-                    if self._validate_opc_structure(record):
-                        self._metrics['records_processed'] += 1
-                        yield record
+                cols = [c for c in df.columns if c in tag_set and c not in ("timestamp", "source_id")]
+                timestamps = df["timestamp"].tolist() if "timestamp" in df.columns else [None] * len(df)
+                values = df[cols].astype(float).to_numpy().tolist()
+                yield from self._emit_csv_rows(
+                    ((ts, _non_null(zip(cols, row))) for ts, row in zip(timestamps, values)), "CSV_WIDE"
+                )
 
         except Exception as e:
             self._metrics['records_failed'] += 1
             logger.error(f"[CSV Reader] Failed to parse: {e}")
             raise
 
+    @staticmethod
+    def _load_csv_frame(path: Path) -> pd.DataFrame:
+        """
+        Parses a CSV with PyArrow's multithreaded reader when available.
+        Long-format tag names load as a category column: each distinct
+        name is stored once instead of once per row.
+        """
+        if pa is None:
+            return pd.read_csv(path, dtype={"Tag Name": "category", "Value": "float64"})
+        table = pa_csv.read_csv(
+            path,
+            read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(column_types={
+                "timestamp": pa.string(),  # Keep ISO timestamps as strings, as pandas does
+                "Tag Name": pa.dictionary(pa.int32(), pa.string()),
+                "Value": pa.float64()
+            }),
+        )
+        return table.to_pandas()
+
+    def _emit_csv_rows(self, rows: Iterable[Tuple[Any, Dict[str, float]]], source_id: str) -> Iterator[Dict[str, Any]]:
+        """Yields one record per (timestamp, tags) pair"""
+        for ts, tags in rows:
+            record = {"timestamp": ts, "source_id": source_id, "tags": tags}
+            if self._validate_opc_structure(record):
+                self._metrics['records_processed'] += 1
+                yield record
+
     def _read_parquet(self, path: Path) -> Iterator[Dict[str, Any]]:
         """Type-annotated Parquet reader"""
         try:
+            if pa is not None:
+                # One record batch in memory at a time; Arrow column names are already str
+                for batch in pq.ParquetFile(path).iter_batches(batch_size=PARQUET_BATCH_SIZE):
+                    for record in batch.to_pylist():
+                        if self._validate_opc_structure(record):
+                            self._metrics['records_processed'] += 1
+                            yield record
+                return
             df = pd.read_parquet(path)
             records = df.to_dict('records')
             for record in records:
@@ -277,7 +486,7 @@ class OPCDataReader:
         # --- END MODIFICATION ---
         try:
             return {
-                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'timestamp': _utc_now_iso(),
                 'source_id': str(data.node_id),
                 'tags': {str(data.node_name): float(data.value)}
             }
@@ -289,12 +498,13 @@ class OPCDataReader:
         if not record.get("_schema_version"):
             record["_schema_version"] = "1.0"
         """Strict type validation"""
-        required = {
-            'timestamp': lambda x: isinstance(x, str) and bool(datetime.fromisoformat(x)),
-            'source_id': lambda x: isinstance(x, str),
-            'tags': lambda x: isinstance(x, dict)
-        }
-        for field, validator in required.items():
+        if _check_opc_schema is not None:
+            try:
+                _check_opc_schema(record)
+                return True
+            except fastjsonschema.JsonSchemaException:
+                pass  # Name the offending field below
+        for field, validator in _OPC_REQUIRED.items():
             if field not in record or not validator(record[field]):
                 raise ValueError(f"Invalid OPC UA structure: Missing {field}")
         return True
@@ -4,15 +4,46 @@ Enterprise Auth with Dynamic Credentials and CI Safeguards
 """
 
 import os
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-from functools import lru_cache
+import signal
+import threading
+import time
+from functools import cache
+from types import MappingProxyType
+from typing import Dict, Any, Final, Mapping, Optional, Tuple
 # from azure.identity import DefaultAzureCredential # MODIFICATION FOR TESTING: Commented out
 # from azure.keyvault.secrets import SecretClient # MODIFICATION FOR TESTING: Commented out
 # from d_config import demo_settings # MODIFICATION FOR TESTING: Commented out (settings is not used directly in this file, only via its path in _vault_read)
 
 logger = logging.getLogger("security.auth")
 
+# --- MODIFICATION FOR TESTING ---
+# Secure mode and CI detection are forced off for local testing. Both are
+# process-wide and fixed at import; AuthManager only holds mutable state.
+_SECURE_MODE: Final[bool] = False # os.getenv("SECURE_AUTH_ENABLED", "false").lower() == "true"
+_CI_ENV: Final[bool] = False # os.getenv("CI", "false").lower() == "true"
+# --- END MODIFICATION ---
+
+TOKEN_CACHE_TTL = 1.0  # seconds a validation result is reused
+TOKEN_CACHE_SIZE = 4096
+CREDENTIALS_TTL = 30.0  # seconds before credentials are re-resolved
+
+# Read-only fallback credentials, shared by every caller
+_EMPTY_CREDENTIALS: Mapping[str, Any] = MappingProxyType({})
+_DUMMY_CREDENTIALS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    "kafka": MappingProxyType({
+        "sasl.username": "dummy_kafka_user", # Changed for clarity
+        "sasl.password": "dummy_kafka_pass", # Changed for clarity
+        "security.protocol": "SASL_SSL",
+        "sasl.mechanism": "PLAIN"
+    }),
+    "opcua": MappingProxyType({
+        "username": "dummy_opcua_admin", # Changed for clarity
+        "password": "dummy_opcua_password" # Changed for clarity
+    })
+})
+
 
 # --- MODIFICATION FOR TESTING ---
 # Create a dummy settings object to avoid ImportError if config.settings isn't fully set up.
@@ -37,25 +68,43 @@ class AuthManager:
     """
 
     def __init__(self):
-        # --- MODIFICATION FOR TESTING ---
-        # Force secure_mode to False and ci_environment to False for local testing
-        self._secure_mode = False # os.getenv("SECURE_AUTH_ENABLED", "false").lower() == "true"
-        self._ci_environment = False # os.getenv("CI", "false").lower() == "true"
-        # --- END MODIFICATION ---
-        logger.info(f"Auth initialized (Secure Mode: {self._secure_mode}, CI: {self._ci_environment}")
+        # token digest -> (expiry on the monotonic clock, validation result)
+        self._token_cache: Dict[bytes, Tuple[float, bool]] = {}
+        # service -> (time resolved on the monotonic clock, credentials)
+        self._cred_cache: Dict[str, Tuple[float, Mapping[str, Any]]] = {}
+        # Environment grouped by first '_'-separated segment: {"KAFKA": {"USERNAME": ...}}
+        self._env_index: Dict[str, Dict[str, str]] = {}
+        self._env_len = -1
+        self._env_built = 0.0
+        logger.info(f"Auth initialized (Secure Mode: {_SECURE_MODE}, CI: {_CI_ENV}")
 
-    @lru_cache(maxsize=32)
-    def get_credentials(self, service: str) -> Dict[str, Any]:
+    def clear_credential_cache(self) -> None:
+        """Forget resolved credentials so the next call re-reads the environment."""
+        self._cred_cache.clear()
+        self._env_len = -1  # Force an environment re-scan as well
+        logger.info("Credential cache cleared")
+
+    def get_credentials(self, service: str) -> Mapping[str, Any]:
         """
         Fetch credentials with dynamic service name support.
+        Results are reused for CREDENTIALS_TTL seconds (or until clear_credential_cache()).
         Args:
             service: Format 'service' or 'service.env' (e.g., 'kafka.prod')
         """
+        entry = self._cred_cache.get(service)
+        if entry is not None and time.monotonic() - entry[0] < CREDENTIALS_TTL:
+            return entry[1]
+        creds = self._resolve_credentials(service)
+        self._cred_cache[service] = (time.monotonic(), creds)
+        return creds
+
+    def _resolve_credentials(self, service: str) -> Mapping[str, Any]:
+        """Uncached credential lookup behind get_credentials()."""
         base_service = service.split(".")[0]  # Original extraction
 
         # --- MODIFICATION FOR TESTING ---
         # Bypass CI environment checks and secure mode for local testing
-        # if self._ci_environment and not self._secure_mode:
+        # if _CI_ENV and not _SECURE_MODE:
         #     raise RuntimeError("Dummy credentials forbidden in CI environment")
         # --- END MODIFICATION ---
 
@@ -65,15 +114,15 @@ class AuthManager:
             # 1. Check environment variables (REPAIRED)
             env_creds = self._get_env_credentials(base_service)
             if env_creds and env_creds.get("sasl.username") and env_creds.get("sasl.password"):
-                logger.info(f"Using environment credentials for {base_service}")
+                logger.info("Using environment credentials for %s", base_service)
                 return env_creds
 
             # 2. Skip Vault if enabled, as we're in testing mode
-            # if self._secure_mode:
+            # if _SECURE_MODE:
             #     return self._get_vault_credentials(base_service)
 
             # 3. Always fallback to dummies
-            logger.info(f"Using dummy credentials for {base_service}")
+            logger.info("Using dummy credentials for %s", base_service)
             return self._get_dummy_credentials(base_service)
 
         except Exception as e:
@@ -82,12 +131,14 @@ class AuthManager:
 
     def _get_env_credentials(self, service: str) -> Optional[Dict[str, Any]]:
         """Fetch credentials from environment variables."""
-        prefix = f"{service.upper()}_"
-        raw = {
-            k[len(prefix):].lower(): v
-            for k, v in os.environ.items()
-            if k.startswith(prefix)
-        }
+        head, _, rest = service.upper().partition("_")
+        group = self._env_group(head)
+        if rest:
+            # Service names containing '_' match a longer prefix within the group
+            rest += "_"
+            raw = {k[len(rest):].lower(): v for k, v in group.items() if k.startswith(rest)}
+        else:
+            raw = {k.lower(): v for k, v in group.items()}
 
         # Minimal key mapping for Kafka
         if service.lower() == "kafka":
@@ -105,34 +156,67 @@ class AuthManager:
 
         return raw
 
-    def _get_dummy_credentials(self, service: str) -> Dict[str, Any]:
+    def _env_group(self, head: str) -> Dict[str, str]:
+        """
+        Environment variables named '<head>_*', keyed by the remainder.
+        The index is rebuilt when the environment size changes, when it is
+        older than CREDENTIALS_TTL, or after clear_credential_cache().
+        """
+        now = time.monotonic()
+        if len(os.environ) != self._env_len or now - self._env_built >= CREDENTIALS_TTL:
+            index: Dict[str, Dict[str, str]] = {}
+            for k, v in os.environ.items():
+                prefix, sep, suffix = k.partition("_")
+                if sep:
+                    index.setdefault(prefix, {})[suffix] = v
+            self._env_index = index
+            self._env_len = len(os.environ)
+            self._env_built = now
+        return self._env_index.get(head, {})
+
+    def _get_dummy_credentials(self, service: str) -> Mapping[str, Any]:
         """Fallback dummy credentials with CI safeguards."""
         # --- MODIFICATION FOR TESTING ---
         # Allow dummy credentials even if CI environment would normally forbid them.
-        # if self._ci_environment:
+        # if _CI_ENV:
         #     raise ValueError("Dummy credentials disabled in CI")
         # --- END MODIFICATION ---
 
-        dummies = {
-            "kafka": {
-                "sasl.username": "dummy_kafka_user", # Changed for clarity
-                "sasl.password": "dummy_kafka_pass", # Changed for clarity
-                "security.protocol": "SASL_SSL",
-                "sasl.mechanism": "PLAIN"
-            },
-            "opcua": {
-                "username": "dummy_opcua_admin", # Changed for clarity
-                "password": "dummy_opcua_password" # Changed for clarity
-            }
-        }
-        return dummies.get(service.lower(), {})
+        return _DUMMY_CREDENTIALS.get(service.lower(), _EMPTY_CREDENTIALS)
 
     def validate_token(self, token: str) -> bool:
+        """
+        Validate a token, reusing the result for TOKEN_CACHE_TTL seconds.
+        Tokens are cached by digest, never stored in the clear.
+        """
+        key = self._token_key(token)
+        now = time.monotonic()
+        cached = self._token_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        valid = self._check_token(token)
+        if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+            self._token_cache = {k: v for k, v in self._token_cache.items() if v[0] > now}
+            if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+                self._token_cache.clear()
+        self._token_cache[key] = (now + TOKEN_CACHE_TTL, valid)
+        return valid
+
+    def invalidate_token(self, token: str) -> None:
+        """Drop a cached validation result (e.g. on logout or revocation)."""
+        self._token_cache.pop(self._token_key(token), None)
+
+    @staticmethod
+    def _token_key(token: str) -> bytes:
+        return hashlib.blake2b((token or "").encode(), digest_size=16).digest()
+
+    def _check_token(self, token: str) -> bool:
         """Placeholder token validator for MQTT or external APIs."""
         # --- MODIFICATION FOR TESTING ---
         # Always validate a token as True for testing purposes, unless it's explicitly 'dummy_token'
         # This makes it easy to bypass real validation.
-        # if self._ci_environment:
+        # if _CI_ENV:
         #     logger.warning("Token validation in CI is not recommended")
         return bool(token and token != "dummy_token_invalid_for_test") # Adjusted dummy token for test
         # --- END MODIFICATION ---
@@ -175,5 +259,43 @@ class AuthManager:
         return creds
 
 
-# Singleton with enhanced safety
-auth = AuthManager()
+# Singleton with enhanced safety, created on first use rather than at import
+@cache
+def get_auth() -> AuthManager:
+    """Return the process-wide AuthManager."""
+    return AuthManager()
+
+
+_sighup_reload_installed = False
+
+
+def install_sighup_reload() -> bool:
+    """
+    Opt-in for application entrypoints: clear the credential cache on SIGHUP
+    instead of terminating. A handler installed before is still called.
+    Installs once per process; returns False where unsupported (no SIGHUP,
+    or not on the main thread, where signal.signal() cannot be called).
+    """
+    global _sighup_reload_installed
+    if _sighup_reload_installed:
+        return True
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    previous = signal.getsignal(signal.SIGHUP)
+
+    def _on_sighup(signum, frame):
+        get_auth().clear_credential_cache()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGHUP, _on_sighup)
+    _sighup_reload_installed = True
+    logger.info("SIGHUP now clears the credential cache")
+    return True
+
+
+def __getattr__(name: str):
+    # Keeps `from d_security.demo_auth import auth` working (lazily)
+    if name == "auth":
+        return get_auth()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
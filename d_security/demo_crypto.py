@@ -12,7 +12,8 @@ Features:
 import os
 import json
 import logging
-from typing import Union, Optional
+from functools import partial
+from typing import Any, Callable, Union, Optional
 # from azure.keyvault.keys import KeyClient # MODIFICATION FOR TESTING: Commented out
 # from azure.identity import DefaultAzureCredential # MODIFICATION FOR TESTING: Commented out
 from d_config.demo_settings import APP_ENV  # Only import static configs
@@ -20,6 +21,13 @@ from d_config.demo_settings import APP_ENV  # Only import static configs
 # Module-level logger (Pylance-compatible)
 logger = logging.getLogger("security.crypto")
 
+# Mock (DEV) encoders by input type
+_MOCK_ENCODERS = {
+    str: lambda data: "encrypted_" + data,
+    bytes: lambda data: "encrypted_" + data.decode("utf-8"),
+    memoryview: lambda data: "encrypted_" + bytes(data).decode("utf-8"),
+}
+
 class CryptoManager:
     """
     Cryptographic operations with fail-secure design.
@@ -36,6 +44,12 @@ class CryptoManager:
             f"Crypto initialized (Secure Mode: {self._secure_mode}, Env: {APP_ENV})",
             extra={"security_event": True}
         )
+        # Encrypt step keyed by exact input type; one dict lookup replaces the
+        # isinstance chain for the common str/bytes payloads
+        self._enc_dispatch = {
+            typ: partial(self._encrypt_value, mock=encoder) for typ, encoder in _MOCK_ENCODERS.items()
+        }
+        self._enc_dispatch[dict] = self._enc_dict
 
     def encrypt(self, data: Union[str, bytes], key_id: Optional[str] = None) -> str:
         """
@@ -47,22 +61,10 @@ class CryptoManager:
             Encrypted data as base64 string
         """
         try:
-            # --- Critical Add: Bypass encryption for KG-ready dicts ---
-            if isinstance(data, dict) and data.get("metadata", {}).get("kg_ready"):
-                return json.dumps(data)
-            if self._secure_mode:
-                return self._secure_encrypt(data, key_id or "default")
-
-            logger.warning(
-                "Using mock encryption (DEV ONLY)",
-                extra={"security_event": True, "sensitive": False}
-            )
-            if isinstance(data, str):
-                return f"encrypted_{data}"
-            elif isinstance(data, (bytes, memoryview)):
-                return f"encrypted_{bytes(data).decode('utf-8')}"
-            else:
-                raise TypeError(f"Unsupported data type for encryption: {type(data)}")
+            enc = self._enc_dispatch.get(type(data))
+            if enc is None:
+                enc = self._subclass_encryptor(type(data))
+            return enc(data, key_id)
 
         except Exception as e:
             logger.critical(
@@ -72,6 +74,34 @@ class CryptoManager:
             )
             raise
 
+    def _subclass_encryptor(self, typ: type) -> Callable[[Any, Optional[str]], str]:
+        """Encrypt step of the nearest supported base class (e.g. for str subclasses)."""
+        for base in typ.__mro__[1:]:
+            enc = self._enc_dispatch.get(base)
+            if enc is not None:
+                return enc
+        raise TypeError(f"Unsupported data type for encryption: {typ}")
+
+    def _encrypt_value(self, data, key_id: Optional[str], mock: Optional[Callable[[Any], str]]) -> str:
+        """Vault encryption in secure mode, else the mock encoder (None: unsupported)."""
+        if self._secure_mode:
+            return self._secure_encrypt(data, key_id or "default")
+
+        logger.warning(
+            "Using mock encryption (DEV ONLY)",
+            extra={"security_event": True, "sensitive": False}
+        )
+        if mock is None:
+            raise TypeError(f"Unsupported data type for encryption: {type(data)}")
+        return mock(data)
+
+    def _enc_dict(self, data: dict, key_id: Optional[str]) -> str:
+        """Dict inputs: KG-ready dicts pass through as JSON, others need secure mode."""
+        # --- Critical Add: Bypass encryption for KG-ready dicts ---
+        if data.get("metadata", {}).get("kg_ready"):
+            return json.dumps(data)
+        return self._encrypt_value(data, key_id, None)
+
     def decrypt(self, data: str, key_id: Optional[str] = None) -> str:
         """Reverse of encrypt() with same security guarantees."""
         if self._secure_mode:
@@ -5,10 +5,16 @@ Enterprise Knowledge Graph Pipeline v2.1
 - Production logging
 """
 
+import csv
+import numpy as np
+import os
 import pandas as pd
 from pathlib import Path
 import logging
-from typing import List, Dict, Any
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple
 from datetime import datetime
 from neo4j.exceptions import Neo4jError
 
@@ -16,11 +22,81 @@ from d_pipelines.demo_data_reader import OPCDataReader
 from d_pipelines.demo_data_processor import processor
 from d_pipelines.demo_data_chunker import chunker
 from KG_opc.kg_persistor import KGPersistor
-from KG_opc.ner_extractor import extract_entities
+from KG_opc.ner_extractor import extract_entities_batch
 from KG_opc.relation_extractor import IndustrialRelationExtractor
 import d_config.demo_settings as settings
+from d_security.demo_auth import install_sighup_reload
 from KG_opc import kg_metadata
 
+try:
+    from numba import njit, prange  # Optional: compiled alarm threshold scan
+except ImportError:
+    njit = None
+    prange = range
+
+ALARM_CSV_PATH = "plant_data/alarm.csv"
+
+# Records per processing/alarm batch, and events per KG write transaction
+PIPELINE_BATCH_SIZE = 1000
+
+# Alarm type -> threshold direction code for the alarm kernel
+_ALARM_HIGH, _ALARM_LOW, _ALARM_NONE = 0, 1, 2
+_ALARM_TYPE_CODES = {
+    "high": _ALARM_HIGH, "highhigh": _ALARM_HIGH, "alert": _ALARM_HIGH,
+    "low": _ALARM_LOW, "lowlow": _ALARM_LOW
+}
+
+
+@lru_cache(maxsize=4)
+def _load_alarm_rules(path: str, mtime: float) -> Mapping[str, Mapping[str, str]]:
+    """
+    Enabled alarm rules keyed by tag name, read once per file version (mtime
+    is part of the cache key). Read-only, since the table is shared.
+    """
+    rules = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            if (row.get("Enabled") or "").lower() != "yes":
+                continue
+            tag = row["Tag Name"]
+            if tag in rules:
+                raise ValueError(f"Duplicate alarm rule for tag {tag}")
+            rules[tag] = MappingProxyType(row)
+    return MappingProxyType(rules)
+
+
+def _alarm_mask(values, thr, hys, typ):
+    """
+    (records, rules) mask of values past their alarm threshold plus
+    hysteresis. Missing readings are NaN and never alarm.
+    """
+    n, m = values.shape
+    out = np.zeros((n, m), np.bool_)
+    for i in prange(n):
+        for j in range(m):
+            v = values[i, j]
+            if typ[j] == 0:
+                out[i, j] = v >= thr[j] + hys[j]
+            elif typ[j] == 1:
+                out[i, j] = v <= thr[j] - hys[j]
+    return out
+
+
+_alarm_mask_jit = njit(cache=True, parallel=True)(_alarm_mask) if njit else None
+
+
+def _alarm_hits(values, thr, hys, typ):
+    """_alarm_mask() through numba when available, else as NumPy expressions"""
+    if _alarm_mask_jit is not None:
+        return _alarm_mask_jit(values, thr, hys, typ)
+    with np.errstate(invalid="ignore"):
+        return np.where(
+            typ == _ALARM_HIGH,
+            values >= thr + hys,
+            (typ == _ALARM_LOW) & (values <= thr - hys)
+        )
+
+
 class KGPipeline:
     def __init__(self):
         self.logger = settings.setup_logging()
@@ -28,64 +104,120 @@ class KGPipeline:
             "d_config/relation_rules.yaml"
         )
 
-    def _process_data(self, data_path: Path) -> List[Dict[str, Any]]:
-        """Ingest and process raw OPC UA data."""
+    def _process_data(self, data_path: Path) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Ingest and process raw OPC UA data, one batch of records at a time.
+        The first batch is read and processed before returning, so a missing
+        or unreadable input fails the run before anything is written.
+        """
         try:
-            raw_records = list(OPCDataReader(str(data_path)).read_records())
-            return [
-                processed
-                for raw in raw_records
-                if (processed := processor.process(raw)) is not None
-            ]
+            raw_records = OPCDataReader(str(data_path)).read_records()
+            batch = list(islice(raw_records, PIPELINE_BATCH_SIZE))
+            first = processor.process_batch(batch) if batch else None
         except Exception as e:
             self.logger.error(f"Data processing failed: {str(e)}")
             raise
+        return self._remaining_batches(first, raw_records)
 
-    def _detect_events(self, processed_records: List[Dict]) -> List[Dict]:
-        """Detect events using dynamic alarm metadata from alarm.csv."""
+    def _remaining_batches(self, first: Any, raw_records: Iterator[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the processed first batch (None: no input), then process the rest."""
+        if first is None:
+            return
+        yield first
         try:
-            alarms_df = pd.read_csv("plant_data/alarm.csv")
-            alarms_df = alarms_df[alarms_df["Enabled"].str.lower() == "yes"]
-            alarm_rules = alarms_df.set_index("Tag Name").to_dict("index")
-            events = []
-
-            for record in processed_records:
-                timestamp = record["timestamp"]
-                for tag, value in record.get("tags", {}).items():
-                    rule = alarm_rules.get(tag)
-                    if not rule:
-                        continue  # No alarm rule for this tag
-
-                    threshold = float(rule["Threshold"])
-                    hysteresis = float(rule["Hysteresis"])
-                    alarm_type = rule["Alarm Type"].lower()
-                    priority = rule.get("Priority", "Low")
-                    unit = rule.get("Unit", "")
-                    description = rule.get("Description", "")
-
-                    # Apply simple logic for high, highhigh, alert
-                    is_alarm = False
-                    if alarm_type in {"high", "highhigh", "alert"} and float(value) >= threshold + hysteresis:
-                        is_alarm = True
-                    elif alarm_type in {"low", "lowlow"} and float(value) <= threshold - hysteresis:
-                        is_alarm = True
-
-                    if is_alarm:
-                        event_type = f"{alarm_type.capitalize()} Alarm"
-                        events.append({
-                            "timestamp": timestamp,
-                            "event_type": event_type,
-                            "description": f"{tag} = {value} {unit} exceeded {alarm_type.upper()} threshold ({threshold})",
-                            "asset_type": "turbine" if "TBN" in tag else "boiler",
-                            "severity": priority.lower()
-                        })
-
-            self.logger.info(f"[KG Pipeline] Detected {len(events)} alarm-driven events")
-            return events
+            while batch := list(islice(raw_records, PIPELINE_BATCH_SIZE)):
+                yield processor.process_batch(batch)
+        except Exception as e:
+            self.logger.error(f"Data processing failed: {str(e)}")
+            raise
 
+    def _detect_events(self, record_batches: Iterable[List[Dict]]) -> Iterator[Dict]:
+        """Detect events using dynamic alarm metadata from alarm.csv."""
+        try:
+            alarm_rules = self._compile_alarm_rules()
         except Exception as e:
             self.logger.error(f"Alarm-driven event detection failed: {str(e)}")
-            return []
+            return
+
+        detected = 0
+        # Errors raised by the batches themselves (reading/processing) propagate
+        for processed_records in record_batches:
+            try:
+                events = self._match_alarms(processed_records, *alarm_rules)
+            except Exception as e:
+                self.logger.error(f"Alarm-driven event detection failed for a batch, skipping it: {str(e)}")
+                continue
+            detected += len(events)
+            yield from events
+
+        self.logger.info(f"[KG Pipeline] Detected {detected} alarm-driven events")
+
+    @staticmethod
+    def _compile_alarm_rules() -> Tuple[Dict[str, int], np.ndarray, np.ndarray, np.ndarray, List[Tuple]]:
+        """
+        Enabled rules from alarm.csv compiled into one column each: threshold,
+        hysteresis and type code arrays for the alarm kernel, plus an event
+        template holding everything but the reading itself.
+        """
+        alarm_rules = _load_alarm_rules(ALARM_CSV_PATH, os.path.getmtime(ALARM_CSV_PATH))
+
+        columns = {}
+        thr, hys, typ, templates = [], [], [], []
+        for j, (tag, rule) in enumerate(alarm_rules.items()):
+            alarm_type = rule["Alarm Type"].lower()
+            threshold = float(rule["Threshold"])
+            columns[tag] = j
+            thr.append(threshold)
+            hys.append(float(rule["Hysteresis"]))
+            typ.append(_ALARM_TYPE_CODES.get(alarm_type, _ALARM_NONE))
+            templates.append((
+                f"{alarm_type.capitalize()} Alarm",
+                f"{rule.get('Unit', '')} exceeded {alarm_type.upper()} threshold ({threshold})",
+                "turbine" if "TBN" in tag else "boiler",
+                rule.get("Priority", "Low").lower()
+            ))
+        return (
+            columns,
+            np.array(thr, dtype=np.float64),
+            np.array(hys, dtype=np.float64),
+            np.array(typ, dtype=np.int8),
+            templates
+        )
+
+    @staticmethod
+    def _match_alarms(processed_records: List[Dict], columns: Dict[str, int], thr: np.ndarray,
+                      hys: np.ndarray, typ: np.ndarray, templates: List[Tuple]) -> List[Dict]:
+        """Events for one batch of records, in record then tag order."""
+        # (records, rules) readings, NaN where a record lacks the tag; NumPy
+        # converts the nested lists in one call instead of cell by cell
+        tag_order = list(columns)
+        values = np.array(
+            [[tags.get(tag, np.nan) for tag in tag_order]
+             for tags in (record.get("tags", {}) for record in processed_records)],
+            dtype=np.float64
+        ).reshape(len(processed_records), len(tag_order))
+
+        hits = _alarm_hits(values, thr, hys, typ)
+        events = []
+
+        # Only records with at least one alarm are revisited, in tag order
+        for i in np.flatnonzero(hits.any(axis=1)):
+            record = processed_records[i]
+            timestamp = record["timestamp"]
+            for tag, value in record["tags"].items():
+                j = columns.get(tag)
+                if j is None or not hits[i, j]:
+                    continue
+
+                event_type, description, asset_type, severity = templates[j]
+                events.append({
+                    "timestamp": timestamp,
+                    "event_type": event_type,
+                    "description": f"{tag} = {value} {description}",
+                    "asset_type": asset_type,
+                    "severity": severity
+                })
+        return events
 
 
     def _create_event(self, row: pd.Series, event_type: str) -> Dict:
@@ -98,63 +230,87 @@ class KGPipeline:
             "severity": "high" if event_type == "Shutdown" else "medium"
         }
 
-    def _build_knowledge_graph(self, events: List[Dict], kg) -> None:
-        """Insert enriched events and relationships into the knowledge graph."""
+    def _build_knowledge_graph(self, events: Iterable[Dict], kg) -> int:
+        """
+        Insert enriched events and relationships into the knowledge graph,
+        PIPELINE_BATCH_SIZE events per transaction. Returns the events consumed.
+        """
+        consumed = 0
+        events = iter(events)
+        while batch := list(islice(events, PIPELINE_BATCH_SIZE)):
+            self._write_event_batch(batch, kg)
+            consumed += len(batch)
+        return consumed
+
+    def _write_event_batch(self, events: List[Dict], kg) -> None:
+        """Insert one batch of events, their concepts and relationships."""
         try:
-            kg_metadata.build_static_kg(kg)  # Always build static part
+            # NER for all descriptions in one nlp.pipe() pass
+            entity_maps = extract_entities_batch([event.get("description", "") for event in events])
+
+            # Collect every event, concept and relationship first, then write
+            # them as UNWIND batches in a single transaction
+            event_rows: List[Dict[str, Any]] = []
+            concepts: Dict[str, None] = {}  # Ordered set of concept texts
+            relationships: List[Dict[str, Any]] = []
 
-            for idx, event in enumerate(events):
+            for event, entities in zip(events, entity_maps):
                 try:
-                    with kg.start_transaction():
+                    # --- Construct event properties ---
+                    event_props = {
+                        "timestamp": str(event.get("timestamp")) if event.get("timestamp") else None,
+                        "event_type": event.get("event_type"),
+                        "description": event.get("description"),
+                        "severity": event.get("severity"),
+                        "tag": event.get("tag"),
+                        "category": event.get("category"),
+                        "source": event.get("source")
+                    }
+                    if not kg.validate_entity({"label": "Event", "properties": event_props}):
+                        continue  # Skip if validation fails
+                    event_rows.append(event_props)
+
+                    # Edges match the Event on the same (string) timestamp it is stored with
+                    event_ref = {"label": "Event", "key": "timestamp", "value": event_props["timestamp"]}
+
+                    # --- Extract concepts ---
+                    entities = entities or {
+                        "keyword": event.get("description", "").lower().split()
+                    }
+                    terms = {term for values in entities.values() for term in values if term}
+                    if terms:
                         self.relation_extractor.set_context(event.get("asset_type", "generic"))
+                        rel_type = self.relation_extractor.infer(event.get("description", ""))
+                    for term in terms:
+                        concepts[term] = None
+                        relationships.append({
+                            "from": event_ref,
+                            "to": {"label": "Concept", "key": "text", "value": term},
+                            "type": rel_type
+                        })
 
-                        # --- Construct event properties ---
-                        event_props = {
-                            "timestamp": str(event.get("timestamp")) if event.get("timestamp") else None,
-                            "event_type": event.get("event_type"),
-                            "description": event.get("description"),
-                            "severity": event.get("severity"),
-                            "tag": event.get("tag"),
-                            "category": event.get("category"),
-                            "source": event.get("source")
-                        }
-
-                        # --- Insert entity safely ---
-                        if not kg.insert_entity({"label": "Event", "properties": event_props}):
-                            continue  # Skip if validation fails
-
-                        # --- Extract and insert concepts ---
-                        entities = extract_entities(event.get("description", "")) or {
-                            "keyword": event.get("description", "").lower().split()
-                        }
-                        terms = {term for values in entities.values() for term in values if term}
-
-                        for term in terms:
-                            kg.insert_entity({
-                                "label": "Concept",
-                                "properties": {"text": term}
-                            })
-
-                            rel_type = self.relation_extractor.infer(event.get("description", ""))
-                            kg.insert_relationship({
-                                "from": {"label": "Event", "key": "timestamp", "value": event.get("timestamp")},
-                                "to": {"label": "Concept", "key": "text", "value": term},
-                                "type": rel_type
-                            })
-
-                        # --- Link to Alarm node if tag is available ---
-                        if event.get("tag"):
-                            alarm_id = f"{event['tag']}_High"  # Default rule, configurable
-                            kg.insert_relationship({
-                                "from": {"label": "Event", "key": "timestamp", "value": event.get("timestamp")},
-                                "to": {"label": "Alarm", "key": "id", "value": alarm_id},
-                                "type": "ACKNOWLEDGES"
-                            })
+                    # --- Link to Alarm node if tag is available ---
+                    if event.get("tag"):
+                        alarm_id = f"{event['tag']}_High"  # Default rule, configurable
+                        relationships.append({
+                            "from": event_ref,
+                            "to": {"label": "Alarm", "key": "id", "value": alarm_id},
+                            "type": "ACKNOWLEDGES"
+                        })
 
                 except Exception as e:
-                    self.logger.error(f"Transaction failed for event {event}: {str(e)}")
+                    self.logger.error(f"Failed to prepare event {event}: {str(e)}")
                     continue
 
+            with kg.start_transaction():
+                kg.insert_entities_bulk("Event", event_rows)
+                kg.insert_entities_bulk("Concept", [{"text": term} for term in concepts])
+                kg.insert_relationships_bulk(relationships)
+            self.logger.info(
+                f"[KG Pipeline] Wrote {len(event_rows)} events, {len(concepts)} concepts "
+                f"and {len(relationships)} relationships"
+            )
+
         except Exception as e:
             self.logger.critical(f"KG construction failed: {str(e)}")
             raise
@@ -166,23 +322,28 @@ class KGPipeline:
             start_time = datetime.now()
             self.logger.info("Starting KG pipeline execution")
 
-            processed_records = self._process_data(Path("new_tag_file.csv"))
-            events = self._detect_events(processed_records)
-
-            self.logger.info(f"[KG Pipeline] Detected {len(events)} dynamic events")
-            if not events:
-                self.logger.warning("No events detected. Skipping KG insertion.")
+            # Records are read, processed and checked for alarms a batch at a
+            # time; events stream into the KG writer as they are detected.
+            # Each event batch commits on its own, so a read or processing
+            # error after the first batch fails the run with the batches
+            # before it already in the KG.
+            events = self._detect_events(self._process_data(Path("new_tag_file.csv")))
 
             with KGPersistor(
                 uri=settings.NEO4J_URI,
                 user=settings.NEO4J_USERNAME,
                 password=settings.NEO4J_PASSWORD,
-                database=settings.NEO4J_DATABASE
+                database=settings.NEO4J_DATABASE,
+                http_url=settings.NEO4J_HTTP_URL,
+                max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE
             ) as kg:
                 kg_metadata.build_static_kg(kg)  # Always run this
 
-                if events:
-                    self._build_knowledge_graph(events, kg)
+                n_events = self._build_knowledge_graph(events, kg)
+
+            self.logger.info(f"[KG Pipeline] Detected {n_events} dynamic events")
+            if not n_events:
+                self.logger.warning("No events detected. KG insertion skipped.")
 
             duration = datetime.now() - start_time
             self.logger.info(f"Pipeline executed in {duration.total_seconds():.2f} seconds")
@@ -194,5 +355,6 @@ class KGPipeline:
 
 
 if __name__ == "__main__":
+    install_sighup_reload()  # SIGHUP re-reads rotated credentials
     pipeline = KGPipeline()
     pipeline.execute()
@@ -0,0 +1,38 @@
+import os
+import signal
+import time
+
+import pytest
+
+from d_security import demo_auth
+from d_security.demo_auth import get_auth, install_sighup_reload
+
+
+@pytest.fixture
+def sighup_reload(monkeypatch):
+    """Installs the SIGHUP reload handler, restoring the previous one afterwards."""
+    if not hasattr(signal, "SIGHUP"):
+        pytest.skip("SIGHUP is not available on this platform")
+    previous = signal.getsignal(signal.SIGHUP)
+    monkeypatch.setattr(demo_auth, "_sighup_reload_installed", False)
+    assert install_sighup_reload()
+    yield
+    signal.signal(signal.SIGHUP, previous)
+
+
+def test_sighup_clears_credential_cache(sighup_reload):
+    auth = get_auth()
+    auth.get_credentials("kafka")
+    assert auth._cred_cache
+
+    os.kill(os.getpid(), signal.SIGHUP)
+    deadline = time.monotonic() + 5
+    while auth._cred_cache and time.monotonic() < deadline:
+        time.sleep(0.01)  # The handler runs between bytecodes of the main thread
+    assert not auth._cred_cache
+
+
+def test_install_is_idempotent(sighup_reload):
+    handler = signal.getsignal(signal.SIGHUP)
+    assert install_sighup_reload()
+    assert signal.getsignal(signal.SIGHUP) is handler
@@ -0,0 +1,52 @@
+import pytest
+
+from d_pipelines import demo_data_chunker
+from d_pipelines.demo_data_chunker import DataChunker
+
+
+@pytest.fixture(params=["numba", "python"])
+def chunker(request, monkeypatch):
+    """A chunker using the compiled boundary scan and the Python loop."""
+    if request.param == "python":
+        monkeypatch.setattr(demo_data_chunker, "_scan_boundaries_jit", None)
+    elif demo_data_chunker._scan_boundaries_jit is None:
+        pytest.skip("numba is not installed")
+    return DataChunker(chunk_size_seconds=300)
+
+
+def _records(values):
+    return [
+        {"timestamp": f"2024-01-01T00:00:{i:02d}", "tags": {"FT101": value}}
+        for i, value in enumerate(values)
+    ]
+
+
+def _boundaries(chunks):
+    return [chunk["metadata"]["record_count"] for chunk in chunks]
+
+
+class _Reentrant(float):
+    """A reading that runs another chunking pass on the same chunker while it
+    is being summed, like a second thread sharing the singleton would."""
+
+    def __radd__(self, other):
+        run, self.run = self.run, None
+        if run is not None:
+            run()
+        return float(other) + float(self)
+
+
+def test_concurrent_iteration_does_not_share_stats(chunker):
+    first = _records([10.0, 10.5, 10.2, 20.0, 20.5, 9.0])
+    second = _records([100.0, 101.0, 50.0, 51.0])
+    expected = _boundaries(chunker.iter_chunks(first, "A"))
+    assert expected == [3, 2, 1]
+
+    nested = []
+    reading = _Reentrant(10.5)
+    reading.run = lambda: nested.extend(chunker.iter_chunks(second, "B"))
+    first[1]["tags"]["FT101"] = reading
+
+    assert _boundaries(chunker.iter_chunks(first, "A")) == expected
+    if nested:  # The compiled scan never sums in Python
+        assert _boundaries(nested) == [2, 2]
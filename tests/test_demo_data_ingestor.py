@@ -0,0 +1,80 @@
+import gc
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from d_pipelines.demo_data_ingestor import DataIngestor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def queue_cwd(tmp_path, monkeypatch):
+    """Runs the test from an empty directory so data/queue starts out empty."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _replay():
+    """Replays the fallback queue from a fresh ingestor and returns the decoded records."""
+    sent = []
+    ingestor = DataIngestor()
+    ingestor._broker_send = sent.append
+    ingestor.retry_fallback_queue()
+    return [json.loads(bytes(payload)) for payload in sent]
+
+
+def test_dropped_ingestor_segment_is_replayed(queue_cwd):
+    ingestor = DataIngestor()
+    ingestor._broker_send = None  # Broker down: records go to the fallback queue
+    records = [{"tag": "FT101", "value": 1.5}, {"tag": "FT102", "value": 2.5}]
+    for record in records:
+        assert not ingestor.ingest(record)
+
+    del ingestor  # Dropped without close()
+    gc.collect()
+
+    assert _replay() == records
+    assert os.listdir(queue_cwd / "data" / "queue") == []
+
+
+def test_segment_of_exited_process_is_replayed(queue_cwd):
+    # The child skips atexit hooks and finalizers, like a killed process
+    script = (
+        "import os\n"
+        "from d_pipelines.demo_data_ingestor import DataIngestor\n"
+        "ingestor = DataIngestor()\n"
+        "ingestor._broker_send = None\n"
+        "ingestor.ingest({'tag': 'TT201', 'value': 3.0})\n"
+        "os._exit(0)\n"
+    )
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    subprocess.run([sys.executable, "-c", script], cwd=queue_cwd, env=env, check=True)
+    leftovers = os.listdir(queue_cwd / "data" / "queue")
+    assert len(leftovers) == 1 and leftovers[0].startswith(".seg_")
+
+    assert _replay() == [{"tag": "TT201", "value": 3.0}]
+    assert os.listdir(queue_cwd / "data" / "queue") == []
+
+
+def test_unserializable_record_does_not_drop_batch(queue_cwd):
+    sent = []
+    ingestor = DataIngestor()
+    ingestor._broker_send = sent.append
+    records = [{"tag": "FT101", "value": 1.5}, {"tag": "FT102", "value": object()}, {"tag": "FT103", "value": 2.5}]
+
+    assert ingestor.ingest_many(records) == 2
+    assert [json.loads(payload) for payload in sent] == [records[0], records[2]]
+
+
+def test_unserializable_record_does_not_drop_queued_batch(queue_cwd):
+    ingestor = DataIngestor()
+    ingestor._broker_send = None
+    records = [{"tag": "FT101", "value": 1.5}, {"tag": "FT102", "value": object()}, {"tag": "FT103", "value": 2.5}]
+
+    assert ingestor.ingest_many(records) == 0
+    ingestor.close()
+    assert _replay() == [records[0], records[2]]
@@ -0,0 +1,42 @@
+import pytest
+
+from d_pipelines import demo_data_reader
+from d_pipelines.demo_data_reader import OPCDataReader
+
+
+@pytest.fixture(params=["fastjsonschema", "fallback"])
+def reader(request, monkeypatch):
+    """A file reader, validating with the compiled schema and with the per-field checks."""
+    if request.param == "fallback":
+        monkeypatch.setattr(demo_data_reader, "_check_opc_schema", None)
+    elif demo_data_reader._check_opc_schema is None:
+        pytest.skip("fastjsonschema is not installed")
+    return OPCDataReader("records.jsonl")
+
+
+def _record(timestamp):
+    return {"timestamp": timestamp, "source_id": "PLC-1", "tags": {"FT101": 1.5}}
+
+
+@pytest.mark.parametrize("timestamp", [
+    "2024-01-31",
+    "2024-12-01T23:59:59",
+    "2024-06-15 08:30:00.123456+05:30",
+    "2024-06-15T08:30Z",
+])
+def test_valid_timestamp_is_accepted(reader, timestamp):
+    assert reader._validate_opc_structure(_record(timestamp))
+
+
+@pytest.mark.parametrize("timestamp", [
+    "2024-13-45T00:00:00",
+    "2024-00-10",
+    "2024-01-32",
+    "2024-01-01T24:00:00",
+    "2024-01-01T12:60:00",
+    "2024-01-01T12:00:61",
+    "2024-01-01T12:00:00+25:00",
+])
+def test_out_of_range_timestamp_is_rejected(reader, timestamp):
+    with pytest.raises(ValueError, match="timestamp"):
+        reader._validate_opc_structure(_record(timestamp))
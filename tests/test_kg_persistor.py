@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+from KG_opc.kg_persistor import KGPersistor, _relationship_query
+
+
+def _rel(props):
+    return {
+        "from": {"label": "Sensor", "key": "tag", "value": "FT101"},
+        "to": {"label": "Equipment", "key": "name", "value": "P-101"},
+        "type": "MEASURES",
+        "properties": props,
+    }
+
+
+def test_relationship_merges_on_its_properties():
+    query = _relationship_query("Sensor", "tag", "Equipment", "name", "MEASURES", ("since", "unit"))
+    assert "MERGE (a)-[x:MEASURES { since: $props.since, unit: $props.unit }]->(b)" in query
+    assert "SET" not in query
+
+
+def test_relationship_without_properties_merges_on_type():
+    query = _relationship_query("Sensor", "tag", "Equipment", "name", "MEASURES")
+    assert query.endswith("MERGE (a)-[x:MEASURES]->(b)")
+
+
+def test_bulk_relationships_with_different_properties_stay_distinct():
+    groups = KGPersistor._group_relationships([
+        _rel({"unit": "m3/h"}),
+        _rel({"unit": "l/s"}),
+        _rel({"unit": "bar", "since": "2024"}),
+    ])
+    assert len(groups) == 2  # One query per property key set
+    for query, rows in groups.items():
+        assert query.startswith("UNWIND $rows AS r ")
+        assert "r.props.unit" in query
+    rows = [row["props"] for rows in groups.values() for row in rows]
+    assert rows == [{"unit": "m3/h"}, {"unit": "l/s"}, {"unit": "bar", "since": "2024"}]
+
+
+def test_rotated_password_gets_its_own_driver():
+    uri = "bolt://localhost:7687"
+    old_key = KGPersistor._make_driver_key(uri, "neo4j", "old-secret")
+    new_key = KGPersistor._make_driver_key(uri, "neo4j", "new-secret")
+    assert old_key != new_key
+    assert "old-secret" not in old_key
+
+    drivers = []
+    try:
+        for key, password in ((old_key, "old-secret"), (old_key, "old-secret"), (new_key, "new-secret")):
+            drivers.append((key, KGPersistor._acquire_driver(key, password, 1)))
+        assert drivers[0][1] is drivers[1][1]
+        assert drivers[2][1] is not drivers[0][1]
+    finally:
+        for key, driver in drivers:  # Driver creation is lazy: nothing connected
+            persistor = KGPersistor.__new__(KGPersistor)
+            persistor._driver_key, persistor.driver = key, driver
+            persistor._release_driver()
+    assert old_key not in KGPersistor._DRIVERS and new_key not in KGPersistor._DRIVERS
+
+
+def _async_persistor():
+    """A persistor whose async driver was used, without a server: drivers connect lazily."""
+    from neo4j import AsyncGraphDatabase
+
+    persistor = KGPersistor.__new__(KGPersistor)
+    persistor.driver = None
+    persistor._async_driver = AsyncGraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "secret"))
+    return persistor
+
+
+def test_sync_close_after_async_use_leaves_async_driver_to_aclose(caplog):
+    persistor = _async_persistor()
+
+    with caplog.at_level(logging.WARNING, logger="kg.persistor"):
+        persistor.close()  # No running loop: must not start one
+    assert "await aclose()" in caplog.text
+    assert persistor._async_driver is not None
+
+    asyncio.run(persistor.aclose())
+    assert persistor._async_driver is None
+
+
+def test_close_inside_running_loop_does_not_raise():
+    persistor = _async_persistor()
+
+    async def use():
+        with persistor:  # Sync context manager used from async code
+            pass
+        assert persistor._async_driver is not None
+        await persistor.aclose()
+
+    asyncio.run(use())
+    assert persistor._async_driver is None
+
+
+def test_async_with_closes_async_driver():
+    persistor = _async_persistor()
+
+    async def use():
+        async with persistor:
+            pass
+
+    asyncio.run(use())
+    assert persistor._async_driver is None